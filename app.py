@@ -1,5 +1,9 @@
+import logging
 import streamlit as st
 from core.auth import login_user, signup_user, logout_user
+from core.model_registry import model_registry
+from core.feedback import feedback_writer
+from utils.query_table import load_query_table
 
 # Must be the first Streamlit command
 st.set_page_config(page_title="Career AI", page_icon="🚀", layout="wide")
@@ -15,6 +19,16 @@ def load_css(file_name):
 # Inject the Glassmorphism CSS
 load_css("assets/style.css")
 
+# Server-side diagnostics go to the log; basicConfig is a no-op once handlers exist
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+# Warm the ML models once per process so the first analysis click doesn't pay for unpickling
+model_registry.warm()
+load_query_table()
+
+# Background feedback writer; also replays events spilled while the database was unreachable
+feedback_writer.start()
+
 # Initialize session state variables
 if "authenticated" not in st.session_state:
     st.session_state["authenticated"] = False
@@ -1,9 +1,12 @@
 import streamlit as st
-from core.database import supabase
+from core.database import get_client, new_client
 
 def login_user(email, password):
     try:
-        response = supabase.auth.sign_in_with_password({"email": email, "password": password})
+        # A fresh client per login, so this session's token never leaks into another's
+        client = new_client()
+        response = client.auth.sign_in_with_password({"email": email, "password": password})
+        st.session_state["supabase_client"] = client
         st.session_state["user"] = response.user
         st.session_state["authenticated"] = True
         return True, "Login successful"
@@ -12,12 +15,15 @@ def login_user(email, password):
 
 def signup_user(email, password):
     try:
-        response = supabase.auth.sign_up({"email": email, "password": password})
+        response = new_client().auth.sign_up({"email": email, "password": password})
         return True, "Signup successful! Check your email to confirm or login if email confirmation is disabled."
     except Exception as e:
         return False, str(e)
 
 def logout_user():
-    supabase.auth.sign_out()
-    st.session_state["authenticated"] = False
-    st.session_state["user"] = None
\ No newline at end of file
+    try:
+        get_client().auth.sign_out()
+    finally:
+        st.session_state.pop("supabase_client", None)
+        st.session_state["authenticated"] = False
+        st.session_state["user"] = None
@@ -1,24 +1,49 @@
-import streamlit as st
-from core.database import supabase
-
-@st.cache_data(ttl=600, show_spinner=False) 
-def get_cached_profile(user_id):
-    """Fetches profile from Supabase and caches it for 10 minutes."""
-    try:
-        response = supabase.table("profiles").select("*").eq("id", user_id).execute()
-        return response.data
-    except Exception as e:
-        return None
+import threading
+from core.database import get_client
+from core.ttl_cache import TTLCache
+
+# Process-wide, keyed by user id, so one user's sync never evicts anyone else's data
+USER_CONTEXT_TTL = 600
+_user_cache = TTLCache(max_bytes=8 * 1024 * 1024, ttl=USER_CONTEXT_TTL)
+
+# Bumped on every invalidation; a fetch that started before it is not cached
+_generations = {}
+_generation_lock = threading.Lock()
+
+def _generation(user_id):
+    with _generation_lock:
+        return _generations.get(user_id, 0)
 
-@st.cache_data(ttl=600, show_spinner=False)
-def get_cached_skills(user_id):
-    """Fetches skill matrix from Supabase and caches it for 10 minutes."""
-    try:
-        response = supabase.table("skill_matrix").select("*").eq("id", user_id).execute()
-        return response.data
-    except Exception as e:
+def _fetch_user_context(user_id):
+    response = get_client().table("user_context").select("profile, skills").eq("id", user_id).execute()
+    if not response.data:
         return None
+    return response.data[0]
+
+def get_user_context(user_id):
+    """
+    Fetches profile + skill matrix in one round trip (the user_context view) and
+    caches it for 10 minutes. Returns {"profile": {...}, "skills": {...} or None},
+    or None when the user has not completed onboarding. Database errors raise
+    (and are not cached).
+    """
+    generation = _generation(user_id)
+    return _user_cache.get_or_compute(
+        user_id,
+        lambda: _fetch_user_context(user_id),
+        cacheable=lambda _: _generation(user_id) == generation,
+    )
+
+def invalidate_user(user_id):
+    """Drops one user's cached context; the next read refetches it."""
+    with _generation_lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+    _user_cache.invalidate(user_id)
+
+def prime_user_context(user_id, context):
+    """Write-through: stores a freshly written context so the next read needs no fetch."""
+    invalidate_user(user_id)
+    _user_cache.set(user_id, context)
 
-def force_clear_cache():
-    """Wipes the cache. Call this when a user edits their profile."""
-    st.cache_data.clear()
\ No newline at end of file
+def get_user_cache_stats():
+    return _user_cache.stats()
@@ -0,0 +1,8 @@
+# Thread pool sizing shared across layers, so the engine doesn't depend on the job layer above it
+
+# Background jobs (utils/jobs.py): long LLM tasks run here instead of on the Streamlit script thread
+JOB_WORKERS = 8
+
+# Stream pumps a single job holds at once (the Scorecard analysis prefetches its
+# critique and rewrite together); sizes the engine's stage pool (utils/engine.py)
+STAGES_PER_JOB = 2
@@ -1,10 +1,55 @@
+import httpx
 import streamlit as st
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
+
+# Shared by every session's client: keep-alive connections are reused across users
+SUPABASE_POOL_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+SUPABASE_TIMEOUT = httpx.Timeout(10.0, connect=3.0, pool=5.0)
 
 @st.cache_resource
-def init_connection() -> Client:
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
+def init_http_pool() -> httpx.HTTPTransport:
+    """One pooled HTTP/2 transport (connections only, no headers) for all Supabase traffic in the process."""
+    return httpx.HTTPTransport(limits=SUPABASE_POOL_LIMITS, http2=True)
+
+def new_client(api_key=None) -> Client:
+    """
+    A lightweight client with its own auth state on top of the shared pool. The
+    httpx.Client is per client, because postgrest writes the session's
+    Authorization header onto it; only the transport underneath is shared. Auth
+    tokens live in memory only and are refreshed on demand by get_client(), so
+    idle sessions don't keep refresh timers alive.
+    """
+    http_client = httpx.Client(transport=init_http_pool(), timeout=SUPABASE_TIMEOUT, follow_redirects=True)
+    options = SyncClientOptions(
+        httpx_client=http_client,
+        auto_refresh_token=False,
+        persist_session=False,
+    )
+    return create_client(st.secrets["SUPABASE_URL"], api_key or st.secrets["SUPABASE_KEY"], options)
 
-supabase = init_connection()
\ No newline at end of file
+def get_client() -> Client:
+    """
+    The current Streamlit session's client. After login it carries that user's
+    access token, so Row Level Security sees the right user and concurrent
+    sessions never overwrite each other's auth state.
+    """
+    client = st.session_state.get("supabase_client")
+    if client is None:
+        client = new_client()
+        st.session_state["supabase_client"] = client
+    # Cheap when the token is valid; refreshes it (and the request headers) once it expires
+    client.auth.get_session()
+    return client
+
+@st.cache_resource
+def get_service_client() -> Client:
+    """
+    Process-wide client for background work that runs outside any user session
+    (e.g. the feedback writer). It has no user JWT, so it needs the service role
+    key to get past Row Level Security; raises if SUPABASE_SERVICE_KEY is missing.
+    """
+    service_key = st.secrets.get("SUPABASE_SERVICE_KEY")
+    if not service_key:
+        raise ValueError("CRITICAL ERROR: SUPABASE_SERVICE_KEY not found in secrets.toml. Background writers need the service role key.")
+    return new_client(service_key)
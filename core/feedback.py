@@ -0,0 +1,198 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from core.database import get_service_client
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_TABLE = "feedback_history"
+FEEDBACK_BATCH_SIZE = 50
+FEEDBACK_FLUSH_INTERVAL = 2.0  # seconds a buffered event may wait before it is written
+FEEDBACK_REPLAY_INTERVAL = 30.0  # seconds between attempts to replay the spill file
+FEEDBACK_SPILL_PATH = ".cache/feedback_spill.jsonl"
+
+_STOP = object()
+
+class FeedbackWriter:
+    """
+    Write-behind buffer for feedback_history. log() only enqueues; a single worker
+    thread bulk-inserts batches every FEEDBACK_FLUSH_INTERVAL seconds or as soon as
+    FEEDBACK_BATCH_SIZE events are waiting. Batches that cannot be written are
+    appended to a local JSONL spill file, which is replayed once the database
+    accepts writes again. Delivery is at-least-once.
+    """
+    def __init__(self, table=FEEDBACK_TABLE, batch_size=FEEDBACK_BATCH_SIZE,
+                 flush_interval=FEEDBACK_FLUSH_INTERVAL, spill_path=FEEDBACK_SPILL_PATH):
+        self.table = table
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._last_replay = 0.0
+        self._writable = False
+        self._counters = {"enqueued": 0, "written": 0, "spilled": 0, "replayed": 0, "quarantined": 0, "failed_batches": 0}
+
+    def start(self):
+        """
+        Starts the worker (idempotent). Replays any spill left by a previous process.
+        Never raises: without a service client (e.g. SUPABASE_SERVICE_KEY missing)
+        events go straight to the spill file and are written once it is configured.
+        """
+        with self._start_lock:
+            if self._thread is None:
+                try:
+                    get_service_client()
+                    self._writable = True
+                except Exception as e:
+                    logger.error("feedback database writes disabled, keeping events in %s: %s", self.spill_path, e)
+                self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def log(self, user_id, feature_name, is_helpful, missing_element="None"):
+        """Buffers one feedback event and returns immediately."""
+        self.start()
+        self._counters["enqueued"] += 1
+        self._queue.put({
+            "user_id": user_id,
+            "feature_name": feature_name,
+            "is_helpful": is_helpful,
+            "missing_element": missing_element,
+        })
+
+    def close(self, timeout=10):
+        """Flushes what is buffered (to the database or the spill file) and stops the worker."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _next_batch(self):
+        """Blocks until an event arrives, then collects more until the batch fills or the interval passes."""
+        batch, stop = [], False
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return batch, stop
+        if first is _STOP:
+            return batch, True
+        batch.append(first)
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if event is _STOP:
+                stop = True
+                break
+            batch.append(event)
+        return batch, stop
+
+    def _run(self):
+        self._replay()
+        while True:
+            batch, stop = self._next_batch()
+            if stop:
+                # Drain whatever was queued behind the stop marker
+                while True:
+                    try:
+                        event = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if event is not _STOP:
+                        batch.append(event)
+            for i in range(0, len(batch), self.batch_size):
+                self._write(batch[i:i + self.batch_size])
+            if stop:
+                return
+            if time.monotonic() - self._last_replay >= FEEDBACK_REPLAY_INTERVAL:
+                self._replay()
+
+    def _insert(self, rows):
+        get_service_client().table(self.table).insert(rows).execute()
+
+    def _write(self, rows):
+        if not self._writable:
+            self._spill(rows)
+            return
+        try:
+            self._insert(rows)
+            self._counters["written"] += len(rows)
+        except Exception as e:
+            logger.warning("insert of %d event(s) failed, spilling to disk: %s", len(rows), e)
+            self._counters["failed_batches"] += 1
+            self._spill(rows)
+
+    def _spill(self, rows):
+        try:
+            os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+            self._counters["spilled"] += len(rows)
+        except OSError as e:
+            logger.error("could not spill %d event(s): %s", len(rows), e)
+
+    def _read_spill(self, path):
+        """Parses a spill file line by line; lines that aren't valid JSON (e.g. cut off by a crash) go to *.bad."""
+        rows, bad = [], []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    bad.append(line if line.endswith("\n") else line + "\n")
+        if bad:
+            self._counters["quarantined"] += len(bad)
+            try:
+                with open(f"{self.spill_path}.bad", "a", encoding="utf-8") as f:
+                    f.writelines(bad)
+                logger.warning("quarantined %d unreadable spill line(s) to %s.bad", len(bad), self.spill_path)
+            except OSError as e:
+                logger.error("dropped %d unreadable spill line(s), could not quarantine them: %s", len(bad), e)
+        return rows
+
+    def _replay(self):
+        """Re-inserts spilled events in batches; whatever still fails goes back to the spill file."""
+        self._last_replay = time.monotonic()
+        if not self._writable or not os.path.exists(self.spill_path):
+            return
+        # Move the file aside first so batches spilled during the replay land in a fresh file
+        replay_path = f"{self.spill_path}.replay"
+        try:
+            if not os.path.exists(replay_path):
+                os.replace(self.spill_path, replay_path)
+            rows = self._read_spill(replay_path)
+        except OSError as e:
+            logger.error("could not read spill file: %s", e)
+            return
+
+        for i in range(0, len(rows), self.batch_size):
+            try:
+                self._insert(rows[i:i + self.batch_size])
+                self._counters["replayed"] += len(rows[i:i + self.batch_size])
+            except Exception as e:
+                logger.warning("replay paused, database still unavailable: %s", e)
+                self._spill(rows[i:])
+                break
+        # Every row is now either written, back in the spill file or quarantined
+        os.remove(replay_path)
+
+    def stats(self):
+        return {**self._counters, "pending": self._queue.qsize(), "spill_on_disk": os.path.exists(self.spill_path), "writable": self._writable}
+
+feedback_writer = FeedbackWriter()
+
+def log_feedback(user_id, feature_name, is_helpful, missing_element="None"):
+    feedback_writer.log(user_id, feature_name, is_helpful, missing_element)
@@ -1,33 +1,195 @@
+import random
+import threading
+import time
 import streamlit as st
 
+# HTTP statuses worth retrying on another key
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Full-jitter backoff between failover attempts; also the longest call() waits for a cooling key
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 4.0
+
+# Cooldowns (seconds) applied when a key misbehaves. A 5xx is the upstream's problem
+# rather than the key's (the circuit breaker handles outages), so it only pauses the
+# key briefly and never past BACKOFF_CAP; requests wait it out instead of failing fast.
+RATE_LIMIT_COOLDOWN = 30.0
+SERVER_ERROR_COOLDOWN = 2.0
+MAX_COOLDOWN = 300.0
+
+def get_status_code(error):
+    """Extracts an HTTP status from google.api_core or requests exceptions."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+def get_retry_after(error):
+    """Seconds the upstream asked us to wait, from a Retry-After header or gRPC RetryInfo."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        value = headers.get("Retry-After")
+        if value is not None:
+            return float(value)
+    except (TypeError, ValueError):
+        pass
+    for detail in getattr(error, "details", None) or []:
+        delay = getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return delay.seconds + delay.nanos / 1e9
+    return None
+
+class KeysCoolingDown(RuntimeError):
+    """Every key in the pool is cooling down for longer than we are willing to wait."""
+    def __init__(self, label, retry_after, reason):
+        super().__init__(f"All {label} API keys are paused after {reason}. Try again in {int(retry_after) + 1}s.")
+        self.retry_after = retry_after
+        self.code = 429 if reason == "rate limiting" else 503
+
+class KeyPool:
+    """
+    Process-wide rotation over one pool of API keys. Every session shares the
+    same cursor and health table, so traffic is spread across the whole pool.
+    """
+    def __init__(self, secret_name, label):
+        self.secret_name = secret_name
+        self.label = label
+        self._lock = threading.Lock()
+        self._cursor = 0
+        self._health = {}
+
+    def keys(self):
+        keys = st.secrets.get(self.secret_name, [])
+        if not keys:
+            raise ValueError(f"CRITICAL ERROR: No {self.label} API keys found in secrets.toml.")
+        return list(keys)
+
+    def size(self):
+        try:
+            return len(self.keys())
+        except ValueError:
+            return 0
+
+    def _health_for(self, key):
+        health = self._health.get(key)
+        if health is None:
+            health = {
+                "successes": 0,
+                "failures": 0,
+                "rate_limited": 0,
+                "server_errors": 0,
+                "consecutive_failures": 0,
+                "latency_ewma": None,
+                "cooldown_until": 0.0,
+                "cooldown_reason": None,
+            }
+            self._health[key] = health
+        return health
+
+    def acquire(self, exclude=()):
+        """Returns the next healthy key in round robin order, skipping cooled-down keys."""
+        keys = self.keys()
+        now = time.monotonic()
+        with self._lock:
+            candidates = [k for k in keys if k not in exclude] or keys
+            for offset in range(len(keys)):
+                key = keys[(self._cursor + offset) % len(keys)]
+                if key in candidates and self._health_for(key)["cooldown_until"] <= now:
+                    self._cursor = (self._cursor + offset + 1) % len(keys)
+                    return key
+            # Every key is cooling down: use the one that recovers first
+            self._cursor += 1
+            return min(candidates, key=lambda k: self._health_for(k)["cooldown_until"])
+
+    def cooldown_remaining(self, key):
+        with self._lock:
+            return max(self._health_for(key)["cooldown_until"] - time.monotonic(), 0.0)
+
+    def report_success(self, key, latency):
+        with self._lock:
+            health = self._health_for(key)
+            health["successes"] += 1
+            health["consecutive_failures"] = 0
+            previous = health["latency_ewma"]
+            health["latency_ewma"] = latency if previous is None else 0.8 * previous + 0.2 * latency
+
+    def report_failure(self, key, status=None, retry_after=None):
+        """
+        Cools the key down after a 429 or 5xx. Anything else (4xx, safety errors,
+        a circuit breaker rejecting the call) says nothing about the key and is ignored.
+        """
+        if status != 429 and (status is None or status < 500):
+            return
+        with self._lock:
+            health = self._health_for(key)
+            health["failures"] += 1
+            health["consecutive_failures"] += 1
+            if status == 429:
+                health["rate_limited"] += 1
+                cooldown = retry_after or RATE_LIMIT_COOLDOWN * 2 ** (health["consecutive_failures"] - 1)
+                health["cooldown_reason"] = "rate limiting"
+            else:
+                health["server_errors"] += 1
+                cooldown = min(retry_after or SERVER_ERROR_COOLDOWN, BACKOFF_CAP)
+                health["cooldown_reason"] = "server errors"
+            health["cooldown_until"] = time.monotonic() + min(cooldown, MAX_COOLDOWN)
+
+    def call(self, fn, max_attempts=None, exclude=()):
+        """
+        Runs fn(key) with automatic failover: on 429/5xx the key is cooled down
+        and the request is retried on the next healthy key after a jittered backoff.
+        Keys in `exclude` are only used once every other key has been tried. When
+        no key is healthy, waits for the first one to recover if that is within
+        BACKOFF_CAP, and otherwise raises KeysCoolingDown without calling upstream.
+        """
+        attempts = max_attempts or min(self.size() + 1, 4)
+        tried = set(exclude)
+        for attempt in range(attempts):
+            key = self.acquire(exclude=tried)
+            wait_for = self.cooldown_remaining(key)
+            if wait_for > BACKOFF_CAP:
+                raise KeysCoolingDown(self.label, wait_for, self._health_for(key)["cooldown_reason"])
+            if wait_for > 0:
+                time.sleep(wait_for)
+            start = time.perf_counter()
+            try:
+                result = fn(key)
+            except Exception as e:
+                status = get_status_code(e)
+                self.report_failure(key, status, get_retry_after(e))
+                if status not in RETRYABLE_STATUSES or attempt == attempts - 1:
+                    raise
+                tried.add(key)
+                time.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+                continue
+            self.report_success(key, time.perf_counter() - start)
+            return result
+
+    def stats(self):
+        """Per-key health, with keys masked for display."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                f"...{key[-4:]}": {
+                    **{k: v for k, v in health.items() if k != "cooldown_until"},
+                    "cooldown_remaining": max(health["cooldown_until"] - now, 0.0),
+                }
+                for key, health in self._health.items()
+            }
+
 class KeyManager:
     def __init__(self):
-        # Initialize rotation indices
-        if "gemini_index" not in st.session_state:
-            st.session_state.gemini_index = 0
-        if "serper_index" not in st.session_state:
-            st.session_state.serper_index = 0
+        self.gemini = KeyPool("GEMINI_API_KEYS", "Gemini")
+        self.serper = KeyPool("SERPER_API_KEYS", "Serper")
 
     def get_next_gemini_key(self):
-        keys = st.secrets.get("GEMINI_API_KEYS", [])
-        if not keys:
-            raise ValueError("CRITICAL ERROR: No Gemini API keys found in secrets.toml.")
-        
-        # Modulo logic: selected_key = pool[request_count % len(pool)]
-        selected_key = keys[st.session_state.gemini_index % len(keys)]
-        
-        # Advance the pointer for the next request
-        st.session_state.gemini_index += 1
-        return selected_key
+        return self.gemini.acquire()
 
     def get_next_serper_key(self):
-        keys = st.secrets.get("SERPER_API_KEYS", [])
-        if not keys:
-            raise ValueError("CRITICAL ERROR: No Serper API keys found in secrets.toml.")
-        
-        selected_key = keys[st.session_state.serper_index % len(keys)]
-        st.session_state.serper_index += 1
-        return selected_key
+        return self.serper.acquire()
 
 # Instantiate a single manager to be imported elsewhere
-key_manager = KeyManager()
\ No newline at end of file
+key_manager = KeyManager()
@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def load_pickle(path):
+    import joblib
+    return joblib.load(path)
+
+def load_npz(path):
+    """Materializes every array so the file handle is not kept open."""
+    import numpy as np
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+def load_engagement_predictor(path):
+    from utils.inference import EngagementPredictor
+    return EngagementPredictor.load(path)
+
+# Artifacts produced by utils/train_models.py: name -> (path, loader)
+MODEL_PATHS = {
+    "persona_lookup": ("ml_models/persona_lookup.npz", load_npz),
+    "engagement_model": ("ml_models/engagement_compiled.npz", load_engagement_predictor),
+}
+
+def _file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ModelRegistry:
+    """
+    Process-wide cache of ML artifacts. Each model is unpickled once and shared
+    by every session; it is reloaded only when the file on disk changes.
+    """
+    def __init__(self):
+        self._artifacts = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._warm_thread = None
+
+    def register(self, name, path, loader=load_pickle):
+        self._artifacts[name] = (path, loader)
+
+    def get(self, name):
+        path, loader = self._artifacts[name]
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        # Fast path: a stat() call, no disk read or unpickling
+        entry = self._entries.get(name)
+        if entry and entry["signature"] == signature:
+            return entry["model"]
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry["signature"] == signature:
+                return entry["model"]
+
+            checksum = _file_checksum(path)
+            if entry and entry["checksum"] == checksum:
+                # File was touched but not rebuilt, keep the loaded object
+                entry["signature"] = signature
+                return entry["model"]
+
+            self._entries[name] = self._load(name, path, loader, signature, checksum, entry)
+            return self._entries[name]["model"]
+
+    def _load(self, name, path, loader, signature, checksum, previous):
+        start = time.perf_counter()
+        model = loader(path)
+        load_seconds = time.perf_counter() - start
+
+        # The pickled size tracks the in-memory footprint closely for array-backed models
+        # and avoids tracing every allocation during the load
+        try:
+            memory_bytes = len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            memory_bytes = os.path.getsize(path)
+
+        logger.info("loaded %s in %.1f ms (~%.2f MB)", name, load_seconds * 1000, memory_bytes / 1e6)
+        return {
+            "model": model,
+            "path": path,
+            "signature": signature,
+            "checksum": checksum,
+            "load_seconds": load_seconds,
+            "memory_bytes": memory_bytes,
+            "loaded_at": time.time(),
+            "loads": (previous["loads"] + 1) if previous else 1,
+        }
+
+    def warm(self, background=True):
+        """Loads every registered artifact. Safe to call on every app rerun."""
+        def _warm_all():
+            for name in list(self._artifacts):
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.warning("failed to warm %s: %s", name, e)
+
+        if not background:
+            _warm_all()
+            return
+        with self._lock:
+            if self._warm_thread is not None:
+                return
+            self._warm_thread = threading.Thread(target=_warm_all, name="model-warmup", daemon=True)
+        self._warm_thread.start()
+
+    def stats(self):
+        """
+        Load time, memory and version info for every loaded model. Like the other
+        stats helpers it is for in-process inspection (a REPL or debugger attached
+        to the server); nothing in the app displays or logs it.
+        """
+        return {
+            name: {k: v for k, v in entry.items() if k != "model"}
+            for name, entry in self._entries.items()
+        }
+
+# Instantiate a single registry to be imported elsewhere
+model_registry = ModelRegistry()
+for _name, (_path, _loader) in MODEL_PATHS.items():
+    model_registry.register(_name, _path, _loader)
@@ -0,0 +1,163 @@
+import logging
+import threading
+import time
+from collections import deque
+from core.key_manager import get_status_code
+
+logger = logging.getLogger(__name__)
+
+# Per upstream: (connect, read) timeouts in seconds and keep-alive pool size.
+# Gemini goes through the SDK's own pooled gRPC channels and takes its deadlines
+# from the engine's generation profiles, so only its breaker applies here.
+UPSTREAMS = {
+    "serper": {"label": "Search API", "timeout": (3.05, 10), "pool_size": 10},
+    "huggingface": {"label": "Image API", "timeout": (5, 90), "pool_size": 4},
+    "gemini": {"label": "AI engine", "timeout": None, "pool_size": None},
+}
+
+# Consecutive failures that open a breaker, and how long it stays open before
+# letting a single probe request through
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30.0
+
+# Latency samples kept per upstream for percentile reporting
+LATENCY_WINDOW = 200
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+def is_upstream_failure(error=None, status=None):
+    """Network errors, timeouts and 5xx count against the upstream; 4xx (incl. 429) are per-request or per-key."""
+    if error is not None:
+        status = get_status_code(error)
+    return status is None or status >= 500
+
+class CircuitBreaker:
+    """
+    closed -> open after BREAKER_FAILURE_THRESHOLD consecutive failures. While open,
+    calls fail fast with CircuitOpenError. After BREAKER_RESET_TIMEOUT one probe is
+    let through (half-open): success closes the breaker, failure re-opens it.
+    """
+    def __init__(self, name, label, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.label = label
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probing = False
+        self._consecutive_failures = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._counters = {"calls": 0, "successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def before_call(self):
+        """Raises CircuitOpenError when the call must not be attempted."""
+        with self._lock:
+            if self._state == "open":
+                remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    self._counters["rejected"] += 1
+                    raise CircuitOpenError(f"{self.label} is temporarily unavailable. Retrying in {int(remaining) + 1}s.")
+                self._state = "half_open"
+            if self._state == "half_open":
+                if self._probing:
+                    self._counters["rejected"] += 1
+                    raise CircuitOpenError(f"{self.label} is recovering. Try again in a moment.")
+                self._probing = True
+            self._counters["calls"] += 1
+
+    def record(self, ok, latency=None):
+        with self._lock:
+            self._probing = False
+            if latency is not None:
+                self._latencies.append(latency)
+            if ok:
+                self._counters["successes"] += 1
+                self._consecutive_failures = 0
+                self._state = "closed"
+                return
+            self._counters["failures"] += 1
+            self._consecutive_failures += 1
+            if self._state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                if self._state != "open":
+                    self._counters["opened"] += 1
+                    logger.warning("circuit for %s opened after %d failure(s)", self.name, self._consecutive_failures)
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def call(self, fn):
+        """Runs fn() under the breaker, timing it and classifying any exception."""
+        self.before_call()
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            self.record(not is_upstream_failure(e), time.perf_counter() - start)
+            raise
+        self.record(True, time.perf_counter() - start)
+        return result
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self._latencies)
+            state = self._state
+            if state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                state = "half_open"  # the next call will probe
+            return {
+                **self._counters,
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "latency_p50_ms": samples[len(samples) // 2] * 1000 if samples else None,
+                "latency_p95_ms": samples[int(len(samples) * 0.95)] * 1000 if samples else None,
+            }
+
+breakers = {name: CircuitBreaker(name, config["label"]) for name, config in UPSTREAMS.items()}
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def get_session(upstream):
+    """Process-wide keep-alive requests.Session for an upstream, shared by every thread."""
+    session = _sessions.get(upstream)
+    if session is not None:
+        return session
+
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _sessions_lock:
+        session = _sessions.get(upstream)
+        if session is None:
+            pool_size = UPSTREAMS[upstream]["pool_size"]
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[upstream] = session
+    return session
+
+def request(upstream, method, url, **kwargs):
+    """
+    Outbound HTTP call to a known upstream over its pooled session, with the
+    upstream's default timeouts and circuit breaker. Returns the response
+    (callers check the status); raises CircuitOpenError when failing fast.
+    """
+    kwargs.setdefault("timeout", UPSTREAMS[upstream]["timeout"])
+    breaker = breakers[upstream]
+    breaker.before_call()
+    start = time.perf_counter()
+    try:
+        response = get_session(upstream).request(method, url, **kwargs)
+    except Exception:
+        breaker.record(False, time.perf_counter() - start)
+        raise
+    breaker.record(not is_upstream_failure(status=response.status_code), time.perf_counter() - start)
+    return response
+
+def guarded(upstream, fn):
+    """Runs fn() under the upstream's breaker, for SDK clients that manage their own connections."""
+    return breakers[upstream].call(fn)
+
+def get_http_stats():
+    """Breaker state, call counters and latency percentiles per upstream."""
+    return {name: breaker.stats() for name, breaker in breakers.items()}
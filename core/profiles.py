@@ -0,0 +1,19 @@
+from core.cache import prime_user_context
+from core.database import get_client
+
+def save_user_context(user_id, profile=None, skills=None):
+    """
+    Upserts profile and skill-matrix fields in one transaction (the
+    upsert_user_context RPC). Fields left out keep their stored value. Returns the
+    fresh {"profile", "skills"} context and writes it through to the user cache,
+    so callers need neither a re-fetch nor a cache clear. Raises on failure, in
+    which case nothing was written.
+    """
+    response = get_client().rpc("upsert_user_context", {
+        "p_user_id": user_id,
+        "p_profile": profile or {},
+        "p_skills": skills or {},
+    }).execute()
+    context = response.data
+    prime_user_context(user_id, context)
+    return context
@@ -1,10 +1,8 @@
 
 import streamlit as st
-from core.database import supabase
 from core.auth import logout_user
-from core.cache import get_cached_profile, get_cached_skills
-from core.auth import logout_user
-from core.cache import force_clear_cache
+from core.cache import get_user_context, invalidate_user
+from core.profiles import save_user_context
 
 # 1. Security Check: Kick them out if they bypassed the login page
 if not st.session_state.get("authenticated", False):
@@ -26,7 +24,7 @@ with st.sidebar:
     
     # The Manual Clear Cache Button
     if st.button("🔄 Sync Data (Clear Cache)", use_container_width=True):
-        force_clear_cache()
+        invalidate_user(user.id)
         st.success("Cache cleared. Data synced.")
         st.rerun()
         
@@ -35,8 +33,7 @@ with st.sidebar:
 def check_profile_exists():
     """Checks if the user has already completed onboarding."""
     try:
-        response = supabase.table("profiles").select("*").eq("id", user.id).execute()
-        return len(response.data) > 0
+        return get_user_context(user.id) is not None
     except Exception as e:
         st.error(f"Database Error: {e}")
         return False
@@ -76,18 +73,13 @@ def show_onboarding():
                 return
                 
             try:
-                # Insert into profiles table [cite: 442]
-                supabase.table("profiles").insert({
-                    "id": user.id,
+                # Profile + skill matrix in one atomic call; the fresh record primes the cache [cite: 442]
+                save_user_context(user.id, profile={
                     "college_year": college_year,
                     "target_role": target_role,
                     "target_ecosystem": target_ecosystem,
                     "voice_tone": voice_tone
-                }).execute()
-                
-                # Insert into skill_matrix table [cite: 442]
-                supabase.table("skill_matrix").insert({
-                    "id": user.id,
+                }, skills={
                     "dsa": dsa,
                     "oops": oops,
                     "dbms": dbms,
@@ -95,7 +87,7 @@ def show_onboarding():
                     "system_design": sys_design,
                     "project_depth": project_depth,
                     "branding_confidence": branding_confidence
-                }).execute()
+                })
                 
                 st.success("Data ingested successfully. Building your dashboard...")
                 st.rerun()
@@ -107,18 +99,16 @@ def show_main_dashboard():
     st.title("Personal Branding Dashboard ")
     st.write("Optimized Career Growth Strategy & Presence. ")
     
-    # Fetch User Context dynamically from Cache
-    from core.cache import get_cached_profile, get_cached_skills
+    # Fetch User Context dynamically from Cache (same cached request as the onboarding check)
     try:
-        prof_data_list = get_cached_profile(user.id)
-        skill_data_list = get_cached_skills(user.id)
+        context = get_user_context(user.id)
         
-        if not prof_data_list or not skill_data_list:
+        if not context or not context["skills"]:
             st.warning("Data sync error. Please re-run onboarding.")
             return
 
-        prof_data = prof_data_list[0]
-        skill_data = skill_data_list[0]
+        prof_data = context["profile"]
+        skill_data = context["skills"]
         
         target_role = prof_data['target_role']
         target_eco = prof_data['target_ecosystem']
@@ -1,12 +1,10 @@
 import streamlit as st
-import requests
-import io
-from PIL import Image
-from core.database import supabase
-from utils.engine import get_gemini_response
+from core.feedback import log_feedback
+from utils.engine import stream_gemini_response
+from utils.jobs import JobQueueFull, follow_job, job_status, pop_job_error, stream_job, submit_job
+from utils.banner import get_banner, render_banner, BANNER_STYLES
 from core.auth import logout_user
-from core.auth import logout_user
-from core.cache import force_clear_cache
+from core.cache import get_user_context, invalidate_user
 
 # 1. Security Check
 if not st.session_state.get("authenticated", False):
@@ -28,7 +26,7 @@ with st.sidebar:
     
     # The Manual Clear Cache Button
     if st.button("🔄 Sync Data (Clear Cache)", use_container_width=True):
-        force_clear_cache()
+        invalidate_user(user_id)
         st.success("Cache cleared. Data synced.")
         st.rerun()
         
@@ -46,14 +44,13 @@ if "branding_refinements" not in st.session_state:
     st.session_state.branding_refinements = []
 
 # 3. Fetch User Context from Cache
-from core.cache import get_cached_profile
 user_id = st.session_state["user"].id
 try:
-    profile_data = get_cached_profile(user_id)
-    if not profile_data:
+    context = get_user_context(user_id)
+    if not context:
         st.error("Profile data missing. Please complete Onboarding.")
         st.stop()
-    user_profile = profile_data[0]
+    user_profile = context["profile"]
     target_role = user_profile['target_role']
     target_ecosystem = user_profile['target_ecosystem']
     default_tone = user_profile['voice_tone']
@@ -61,30 +58,31 @@ except Exception as e:
     st.error(f"Database Error: {e}")
     st.stop()
 
-# 4. Input & Preferences Layout
-with st.container(border=True):
-    col1, col2 = st.columns([1, 1])
+# 4. Input, generation, results and Banner Studio are separate fragments, so typing
+# in one section or tweaking its settings doesn't rerun the others
+@st.fragment
+def profile_optimizer():
+    with st.container(border=True):
+        col1, col2 = st.columns([1, 1])
 
-    with col1:
-        st.subheader("Current Presence")
-        current_headline = st.text_area("Current Headline", placeholder="e.g., Student at RGUKT | Learning Python")
-        current_about = st.text_area("About Section", placeholder="Paste your current about section here...", height=150)
-        
-    with col2:
-        st.subheader("Optimization Settings")
-        st.write("**Step 1: Set Generation Preferences**")
-        active_tone = st.selectbox("Brand Tone", ["Professional", "Energetic", "Authoritative", "Empathetic", "Witty"], index=["Professional", "Energetic", "Authoritative", "Empathetic", "Witty"].index(default_tone))
-        focus_area = st.selectbox("Primary Focus", ["Keyword Optimization (SEO)", "Storytelling & Journey", "Metric & Impact Driven"])
-        
-        analyze_profile = st.button("Generate Optimized Profile", type="primary", use_container_width=True)
-
-# 5. Intelligence Layer (Text Optimization)
-if analyze_profile:
-    if not current_headline or not current_about:
-        st.warning("Provide both your current headline and about section for a complete analysis.")
-    else:
-        with st.spinner("Analyzing profile and generating improvements..."):
+        with col1:
+            st.subheader("Current Presence")
+            current_headline = st.text_area("Current Headline", placeholder="e.g., Student at RGUKT | Learning Python")
+            current_about = st.text_area("About Section", placeholder="Paste your current about section here...", height=150)
             
+        with col2:
+            st.subheader("Optimization Settings")
+            st.write("**Step 1: Set Generation Preferences**")
+            active_tone = st.selectbox("Brand Tone", ["Professional", "Energetic", "Authoritative", "Empathetic", "Witty"], index=["Professional", "Energetic", "Authoritative", "Empathetic", "Witty"].index(default_tone))
+            focus_area = st.selectbox("Primary Focus", ["Keyword Optimization (SEO)", "Storytelling & Journey", "Metric & Impact Driven"])
+            
+            analyze_profile = st.button("Generate Optimized Profile", type="primary", use_container_width=True, disabled=bool(st.session_state.get("branding_job")))
+
+    # 5. Intelligence Layer (Text Optimization)
+    if analyze_profile:
+        if not current_headline or not current_about:
+            st.warning("Provide both your current headline and about section for a complete analysis.")
+        else:
             # Construct the Adaptive Prompt
             rewrite_prompt = f"""
             Rewrite this LinkedIn profile for a user targeting a {target_role} role at a {target_ecosystem}.
@@ -105,19 +103,28 @@ if analyze_profile:
             if st.session_state.branding_refinements:
                 rewrite_prompt += f"\n\nCRITICAL INSTRUCTION - Adjust the output strictly based on this previous feedback: {st.session_state.branding_refinements[-1]}"
             
-            rewrite_response = get_gemini_response(rewrite_prompt)
-            
+            # Generated in the background job pool (fresh variation on every click) and
+            # streamed here while the user stays; the status panel below covers returns
             try:
-                st.session_state.opt_headline = rewrite_response.split("[NEW HEADLINE]")[1].split("[NEW ABOUT]")[0].strip()
-                st.session_state.opt_about = rewrite_response.split("[NEW ABOUT]")[1].strip()
-            except:
-                st.session_state.opt_headline = "Error parsing AI response."
-                st.session_state.opt_about = rewrite_response
-            
-            st.rerun()
+                st.session_state.branding_job = submit_job(user_id, "profile_rewrite", stream_job, stream_gemini_response(rewrite_prompt, cache=False, profile="profile_rewrite"))
+            except JobQueueFull as e:
+                st.warning(str(e))
+            else:
+                follow_job("branding_job", "Analyzing profile and generating improvements", store_rewrite)
+
+def store_rewrite(rewrite_response):
+    try:
+        st.session_state.opt_headline = rewrite_response.split("[NEW HEADLINE]")[1].split("[NEW ABOUT]")[0].strip()
+        st.session_state.opt_about = rewrite_response.split("[NEW ABOUT]")[1].strip()
+    except:
+        st.session_state.opt_headline = "Error parsing AI response."
+        st.session_state.opt_about = rewrite_response
 
 # --- POST-GENERATION ITERATIVE FEEDBACK LOOP ---
-if st.session_state.opt_headline and st.session_state.opt_about:
+@st.fragment
+def optimized_profile():
+    if not (st.session_state.opt_headline and st.session_state.opt_about):
+        return
     st.divider()
     st.subheader("AI Suggested Improvements")
     
@@ -134,20 +141,12 @@ if st.session_state.opt_headline and st.session_state.opt_about:
         
         with fb_col1:
             if st.button("👍 Looks great, save feedback", use_container_width=True):
-                try:
-                    supabase.table("feedback_history").insert({
-                        "user_id": user_id,
-                        "feature_name": "LinkedIn Optimizer",
-                        "is_helpful": True,
-                        "missing_element": "None"
-                    }).execute()
-                    st.success("Feedback logged! Copy your text and update your LinkedIn.")
-                    # Clear memory so they can start a fresh generation later
-                    st.session_state.opt_headline = None
-                    st.session_state.opt_about = None
-                    st.session_state.branding_refinements = []
-                except Exception as e:
-                    st.error(f"DB Error: {e}")
+                log_feedback(user_id, "LinkedIn Optimizer", True)
+                st.success("Feedback logged! Copy your text and update your LinkedIn.")
+                # Clear memory so they can start a fresh generation later
+                st.session_state.opt_headline = None
+                st.session_state.opt_about = None
+                st.session_state.branding_refinements = []
                     
         with fb_col2:
             with st.popover("👎 Needs Changes (Iterate)", use_container_width=True):
@@ -155,53 +154,48 @@ if st.session_state.opt_headline and st.session_state.opt_about:
                 if st.button("Log Feedback & Prepare Regeneration", key="brand_regen"):
                     if refinement:
                         st.session_state.branding_refinements.append(refinement)
-                        try:
-                            supabase.table("feedback_history").insert({
-                                "user_id": user_id,
-                                "feature_name": "LinkedIn Optimizer",
-                                "is_helpful": False,
-                                "missing_element": refinement
-                            }).execute()
-                        except:
-                            pass
+                        log_feedback(user_id, "LinkedIn Optimizer", False, refinement)
                         st.info("Feedback logged. Click 'Generate Optimized Profile' above to apply changes.")
                     else:
                         st.warning("Specify what to change.")
 
-# 6. Banner Studio (Un-indented so it always shows)
-st.divider()
-st.subheader("🎨 Banner Studio (Experimental)")
-st.write("Generate a professional LinkedIn background banner to match your new personal brand.")
+# 6. Banner Studio
+@st.fragment
+def banner_studio():
+    st.divider()
+    st.subheader("🎨 Banner Studio (Experimental)")
+    st.write("Generate a professional LinkedIn background banner to match your new personal brand.")
 
-with st.container(border=True):
-    banner_col1, banner_col2 = st.columns([1, 2])
-    
-    with banner_col1:
-        banner_style = st.selectbox(
-            "Visual Style", 
-            ["Professional Blue Tech Modern", "Dark Mode Minimalist", "Creative Startup Vibrant", "Corporate Abstract"]
-        )
-        generate_img_btn = st.button("Generate Banner", type="secondary", use_container_width=True)
+    with st.container(border=True):
+        banner_col1, banner_col2 = st.columns([1, 2])
         
-    with banner_col2:
-        if generate_img_btn:
-            with st.spinner("Calling Hugging Face Diffusion API (This may take 20-40 seconds)..."):
-                
-                API_URL = "https://router.huggingface.co/hf-inference/models/stabilityai/stable-diffusion-xl-base-1.0"
-                headers = {"Authorization": f"Bearer {st.secrets.get('HF_TOKEN_1')}"}
+        with banner_col1:
+            banner_style = st.selectbox("Visual Style", BANNER_STYLES)
+            renderer = st.radio("Renderer", ["Instant (Local)", "Premium (AI Diffusion)"], horizontal=True)
+            generate_img_btn = st.button("Generate Banner", type="secondary", use_container_width=True)
             
+        with banner_col2:
+            if generate_img_btn and renderer == "Instant (Local)":
+                # Procedural renderer: no network, encoded bytes go straight to st.image
+                st.image(render_banner(target_role, banner_style), caption=f"Generated: {banner_style}", use_container_width=True)
+            elif generate_img_btn:
+                with st.spinner("Loading premium banner (a first-time style may take 20-40 seconds)..."):
+                    try:
+                        # Served from the pre-rendered cache when available
+                        image_bytes = get_banner(target_role, banner_style)
+                        st.image(image_bytes, caption=f"Generated: {banner_style}", use_container_width=True)
+                    except RuntimeError as e:
+                        st.error(str(e))
+                    except Exception as e:
+                        st.error(f"Failed to connect to image generator: {e}")
+            else:
+                st.info("Click 'Generate Banner' to create a custom background image. Premium mode uses a remote diffusion model and may be slow.")
 
-                img_prompt = f"A professional LinkedIn background banner for a {target_role}, style: {banner_style}, high resolution, clean corporate aesthetic, abstract geometric shapes, no text, no words."
-                
-                try:
-                    img_response = requests.post(API_URL, headers=headers, json={"inputs": img_prompt})
-                    
-                    if img_response.status_code == 200:
-                        image = Image.open(io.BytesIO(img_response.content))
-                        st.image(image, caption=f"Generated: {banner_style}", use_container_width=True)
-                    else:
-                        st.error(f"Image API Error: {img_response.status_code}. The model might be loading.")
-                except Exception as e:
-                    st.error(f"Failed to connect to image generator: {e}")
-        else:
-            st.info("Click 'Generate Banner' to create a custom background image. Warning: High latency.")
\ No newline at end of file
+profile_optimizer()
+if st.session_state.get("branding_job"):
+    job_status("branding_job", "Analyzing profile and generating improvements", store_rewrite)
+rewrite_error = pop_job_error("branding_job")
+if rewrite_error:
+    st.error(f"Profile rewrite failed: {rewrite_error}")
+optimized_profile()
+banner_studio() # Always shows, independent of the optimizer state
@@ -1,12 +1,10 @@
 import streamlit as st
-import pandas as pd
-import plotly.graph_objects as go
-import joblib
-from core.database import supabase
-from utils.engine import get_gemini_response
+from core.feedback import log_feedback
+from core.model_registry import model_registry
+from utils.engine import stream_gemini_response
+from utils.jobs import JobQueueFull, follow_job, job_status, pop_job_error, stream_job, submit_job
 from core.auth import logout_user
-from core.auth import logout_user
-from core.cache import force_clear_cache
+from core.cache import get_user_context, invalidate_user
 
 
 # 1. Security Check
@@ -26,7 +24,7 @@ with st.sidebar:
     
     # The Manual Clear Cache Button
     if st.button("🔄 Sync Data (Clear Cache)", use_container_width=True):
-        force_clear_cache()
+        invalidate_user(st.session_state["user"].id)
         st.success("Cache cleared. Data synced.")
         st.rerun()
         
@@ -42,21 +40,19 @@ if "refinement_history" not in st.session_state:
     st.session_state.refinement_history = []
 
 # 3. Fetch Contextual User Data from Cache
-from core.cache import get_cached_skills, get_cached_profile
 
 user_id = st.session_state["user"].id
 
 try:
-    # Fetch BOTH skills and profile from the cache
-    skills_data = get_cached_skills(user_id)
-    profile_data = get_cached_profile(user_id)
+    # Skills and profile arrive together in one cached request
+    context = get_user_context(user_id)
     
-    if not skills_data or not profile_data:
+    if not context or not context["skills"]:
         st.warning("Data missing. Please complete Onboarding first.")
         st.stop()
         
-    user_skills = skills_data[0]
-    user_profile = profile_data[0]
+    user_skills = context["skills"]
+    user_profile = context["profile"]
 except Exception as e:
     st.error(f"Database Error: {e}")
     st.stop()
@@ -67,86 +63,77 @@ user_values = [
     user_skills['os'], user_skills['system_design']
 ]
 
-# 4. Target Input
-target_job = st.text_input("Where do you want to go next?", value=user_profile.get('target_role', 'SDE'))
-
-if target_job:
-    target_values = [5, 4, 4, 4, 5] if "SDE" in target_job.upper() or "GOOGLE" in target_job.upper() else [4, 4, 4, 3, 3]
-
-    col1, col2 = st.columns([1, 1])
-    
-    with col1:
-        with st.container(border=True):
-            st.subheader("Visual Analysis")
-            fig = go.Figure()
-            fig.add_trace(go.Scatterpolar(r=user_values + [user_values[0]], theta=categories + [categories[0]], fill='toself', name='Your Skills', line_color='#3b82f6'))
-            fig.add_trace(go.Scatterpolar(r=target_values + [target_values[0]], theta=categories + [categories[0]], fill='toself', name='Target Requirements', line_color='#10b981'))
-            
-            # CSS Overrides for Dark Mode Radar Chart
-            fig.update_layout(
-                polar=dict(radialaxis=dict(visible=True, range=[0, 5], gridcolor="rgba(255,255,255,0.2)")), 
-                showlegend=True, 
-                margin=dict(l=40, r=40, t=40, b=40),
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(0,0,0,0)',
-                font=dict(color='white')
-            )
-            st.plotly_chart(fig, use_container_width=True)
+# 4. Independent sections run as fragments: interacting with one reruns only that
+# section, not the context fetch, the radar chart or the persona lookup
+@st.fragment
+def skill_radar(user_values, target_values):
+    with st.container(border=True):
+        st.subheader("Visual Analysis")
+        import plotly.graph_objects as go # Lazy: only paid when the chart renders
+        fig = go.Figure()
+        fig.add_trace(go.Scatterpolar(r=user_values + [user_values[0]], theta=categories + [categories[0]], fill='toself', name='Your Skills', line_color='#3b82f6'))
+        fig.add_trace(go.Scatterpolar(r=target_values + [target_values[0]], theta=categories + [categories[0]], fill='toself', name='Target Requirements', line_color='#10b981'))
+        
+        # CSS Overrides for Dark Mode Radar Chart
+        fig.update_layout(
+            polar=dict(radialaxis=dict(visible=True, range=[0, 5], gridcolor="rgba(255,255,255,0.2)")), 
+            showlegend=True, 
+            margin=dict(l=40, r=40, t=40, b=40),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='white')
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        try:
+            # Every skill vector (5 skills x levels 1-5) has a precomputed persona: O(1) array index
+            personas = model_registry.get("persona_lookup")
+            index = sum((value - 1) * 5 ** (4 - i) for i, value in enumerate(user_values))
+            detected_persona = str(personas["labels"][personas["lookup"][index]])
             
-            try:
-                kmeans = joblib.load('ml_models/skill_clusterer.pkl')
-                cluster_id = kmeans.predict([user_values])[0]
-                
-                # The 10 Persona Mapping Dictionary
-                persona_map = {
-                    0: "The Competitive Programmer",
-                    1: "The Backend Architect",
-                    2: "The DevOps / SRE",
-                    3: "The Database Administrator",
-                    4: "The Systems Programmer",
-                    5: "The Core Generalist",
-                    6: "The UI/Frontend Specialist",
-                    7: "The Academic Beginner",
-                    8: "The Enterprise Java Dev",
-                    9: "The FAANG Unicorn"
-                }
+            st.markdown(f"### 🤖 ML Persona Detected:")
+            st.info(f"**{detected_persona}**")
+        except Exception as e:
+            st.caption(f"ML Clusterer Offline: {e}")
+
+@st.fragment
+def roadmap_generator(target_job, user_values, target_values):
+    with st.container(border=True):
+        st.subheader("Adaptive Roadmap Engine")
+        
+        # --- EXPLICIT PRE-PREFERENCE ---
+        st.write("**Step 1: Set Generation Preferences**")
+        strategy = st.selectbox("Learning Strategy", ["Project-Heavy Execution", "Theory & Fundamentals First", "Strict FAANG Interview Prep"])
+        timeline = st.slider("Timeline (Months)", 1, 6, 3)
+        
+        gaps = {cat: (tgt - usr) for cat, usr, tgt in zip(categories, user_values, target_values) if tgt > usr}
+        
+        if not gaps:
+            st.success("Your fundamentals match or exceed the requirements. Time to focus on project execution.")
+        else:
+            generating = bool(st.session_state.get("roadmap_job"))
+            if st.button("Generate Action Plan", type="primary", use_container_width=True, disabled=generating):
+                gap_str = ", ".join([f"{k} (-{v})" for k, v in gaps.items()])
                 
-                detected_persona = persona_map.get(cluster_id, "Unknown Entity")
+                prompt = f"User aims for '{target_job}'. Gaps: {gap_str}. Strategy: {strategy}. Timeline: {timeline} months. Generate a strict markdown checklist to close these gaps. Keep it under 10 lines."
                 
-                st.markdown(f"### 🤖 ML Persona Detected:")
-                st.info(f"**{detected_persona}**")
-            except Exception as e:
-                st.caption(f"ML Clusterer Offline: {e}")
-
-    with col2:
-        with st.container(border=True):
-            st.subheader("Adaptive Roadmap Engine")
-            
-            # --- EXPLICIT PRE-PREFERENCE ---
-            st.write("**Step 1: Set Generation Preferences**")
-            strategy = st.selectbox("Learning Strategy", ["Project-Heavy Execution", "Theory & Fundamentals First", "Strict FAANG Interview Prep"])
-            timeline = st.slider("Timeline (Months)", 1, 6, 3)
-            
-            gaps = {cat: (tgt - usr) for cat, usr, tgt in zip(categories, user_values, target_values) if tgt > usr}
-            
-            if not gaps:
-                st.success("Your fundamentals match or exceed the requirements. Time to focus on project execution.")
-            else:
-                if st.button("Generate Action Plan", type="primary", use_container_width=True):
-                    with st.spinner("Compiling personalized roadmap..."):
-                        gap_str = ", ".join([f"{k} (-{v})" for k, v in gaps.items()])
-                        
-                        prompt = f"User aims for '{target_job}'. Gaps: {gap_str}. Strategy: {strategy}. Timeline: {timeline} months. Generate a strict markdown checklist to close these gaps. Keep it under 10 lines."
-                        
-                        # Inject past iterative feedback if it exists
-                        if st.session_state.refinement_history:
-                            prompt += f"\n\nCRITICAL INSTRUCTION - Adjust the output based on this user feedback: {st.session_state.refinement_history[-1]}"
-                            
-                        st.session_state.current_roadmap = get_gemini_response(prompt)
-                        st.rerun()
+                # Inject past iterative feedback if it exists
+                if st.session_state.refinement_history:
+                    prompt += f"\n\nCRITICAL INSTRUCTION - Adjust the output based on this user feedback: {st.session_state.refinement_history[-1]}"
+                    
+                # Generated in the background job pool and streamed here while the user
+                # stays; the status panel below polls for it if they come back later
+                try:
+                    st.session_state.roadmap_job = submit_job(user_id, "roadmap", stream_job, stream_gemini_response(prompt, profile="roadmap"))
+                except JobQueueFull as e:
+                    st.warning(str(e))
+                else:
+                    follow_job("roadmap_job", "Compiling personalized roadmap", store_roadmap)
 
-# --- POST-GENERATION ITERATIVE FEEDBACK LOOP ---
-if st.session_state.current_roadmap:
+@st.fragment
+def roadmap_feedback():
+    if not st.session_state.current_roadmap:
+        return
     st.divider()
     st.subheader("Your Custom Action Plan")
     with st.container(border=True):
@@ -158,18 +145,10 @@ if st.session_state.current_roadmap:
         
         with fb_col1:
             if st.button("👍 Perfect, Lock it in", use_container_width=True):
-                try:
-                    supabase.table("feedback_history").insert({
-                        "user_id": user_id,
-                        "feature_name": "Skill Gap Roadmap",
-                        "is_helpful": True,
-                        "missing_element": "None"
-                    }).execute()
-                    st.success("Roadmap saved and feedback logged to database!")
-                    st.session_state.current_roadmap = None # Clear memory for next task
-                    st.session_state.refinement_history = []
-                except Exception as e:
-                    st.error(f"DB Error: {e}")
+                log_feedback(user_id, "Skill Gap Roadmap", True)
+                st.success("Roadmap saved and feedback logged to database!")
+                st.session_state.current_roadmap = None # Clear memory for next task
+                st.session_state.refinement_history = []
                     
         with fb_col2:
             with st.popover("👎 Needs Changes (Iterate)", use_container_width=True):
@@ -177,15 +156,32 @@ if st.session_state.current_roadmap:
                 if st.button("Log Feedback & Prepare Regeneration"):
                     if refinement:
                         st.session_state.refinement_history.append(refinement)
-                        try:
-                            supabase.table("feedback_history").insert({
-                                "user_id": user_id,
-                                "feature_name": "Skill Gap Roadmap",
-                                "is_helpful": False,
-                                "missing_element": refinement
-                            }).execute()
-                        except:
-                            pass
+                        log_feedback(user_id, "Skill Gap Roadmap", False, refinement)
                         st.info("Feedback logged. Click 'Generate Action Plan' above to apply changes.")
                     else:
-                        st.warning("Do not be lazy. Specify what to change.")
\ No newline at end of file
+                        st.warning("Do not be lazy. Specify what to change.")
+
+def store_roadmap(roadmap):
+    st.session_state.current_roadmap = roadmap
+
+# 5. Target Input
+target_job = st.text_input("Where do you want to go next?", value=user_profile.get('target_role', 'SDE'))
+
+if target_job:
+    target_values = [5, 4, 4, 4, 5] if "SDE" in target_job.upper() or "GOOGLE" in target_job.upper() else [4, 4, 4, 3, 3]
+
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        skill_radar(user_values, target_values)
+    with col2:
+        roadmap_generator(target_job, user_values, target_values)
+
+# --- BACKGROUND GENERATION (survives reruns and page switches) ---
+if st.session_state.get("roadmap_job"):
+    job_status("roadmap_job", "Compiling personalized roadmap", store_roadmap)
+roadmap_error = pop_job_error("roadmap_job")
+if roadmap_error:
+    st.error(f"Roadmap generation failed: {roadmap_error}")
+
+# --- POST-GENERATION ITERATIVE FEEDBACK LOOP ---
+roadmap_feedback()
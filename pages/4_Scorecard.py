@@ -1,11 +1,11 @@
 import streamlit as st
-import joblib
-import numpy as np
-from core.database import supabase
-from utils.engine import get_gemini_response
+import random
+from core.feedback import log_feedback
+from core.model_registry import model_registry
+from utils.engine import get_profile, stream_gemini_response, prefetch_stream
+from utils.jobs import JobQueueFull, follow_job, job_status, pop_job_error, stream_job, submit_job
 from core.auth import logout_user
-from core.auth import logout_user
-from core.cache import force_clear_cache
+from core.cache import get_user_context, invalidate_user
 
 # 1. Security Check
 if not st.session_state.get("authenticated", False):
@@ -27,12 +27,16 @@ with st.sidebar:
     
     # The Manual Clear Cache Button
     if st.button("🔄 Sync Data (Clear Cache)", use_container_width=True):
-        force_clear_cache()
+        invalidate_user(user_id)
         st.success("Cache cleared. Data synced.")
         st.rerun()
         
     st.button("Logout", on_click=logout_user, use_container_width=True)
 
+# Per-phase timeouts (seconds) for the LLM phases of the analysis, from their generation profiles
+CRITIQUE_TIMEOUT = get_profile("critique")["timeout"]
+REWRITE_TIMEOUT = get_profile("post_rewrite")["timeout"]
+
 st.title("🔥 Viral Scorecard & AI Rewriter")
 st.write("Predict engagement, receive harsh critique, and let AI rewrite your post to match your MNC persona.")
 
@@ -48,13 +52,13 @@ if "sc_clarity" not in st.session_state:
 if "scorecard_refinements" not in st.session_state:
     st.session_state.scorecard_refinements = []
 
-# 3. Fetch User Context
+# 3. Fetch User Context from Cache
 try:
-    prof_res = supabase.table("profiles").select("*").eq("id", user_id).execute()
-    if not prof_res.data:
+    context = get_user_context(user_id)
+    if not context:
         st.warning("Profile data missing. Please complete Onboarding.")
         st.stop()
-    p_data = prof_res.data[0]
+    p_data = context["profile"]
     target_role = p_data.get('target_role', 'SDE')
     target_eco = p_data.get('target_ecosystem', 'FAANG/Big Tech')
     voice_tone = p_data.get('voice_tone', 'Professional')
@@ -65,46 +69,96 @@ except Exception as e:
 # 4. Input Area
 with st.container(border=True):
     draft_post = st.text_area("Draft your message...", placeholder="e.g., Hey Im studying 2nd year and learned HTML...", height=150)
-    analyze_btn = st.button("Analyze & Rewrite Post", type="primary", use_container_width=True)
+    analyze_btn = st.button("Analyze & Rewrite Post", type="primary", use_container_width=True, disabled=bool(st.session_state.get("scorecard_job")))
+
+# 5. Intelligence Engine (runs in the background job pool, so leaving the page doesn't lose it)
+def analyze_draft(job, draft_post, critique_prompt, rewrite_prompt):
+    # The phases are independent: both LLM streams start immediately in the
+    # background, each with its own timeout, while the ML prediction runs here
+    critique_stream = prefetch_stream(stream_gemini_response(critique_prompt, profile="critique"), CRITIQUE_TIMEOUT, "Critique timed out. Try analyzing again.")
+    rewrite_stream = prefetch_stream(stream_gemini_response(rewrite_prompt, cache=False, profile="post_rewrite"), REWRITE_TIMEOUT, "Rewrite timed out. Try analyzing again.")
+
+    # Phase A: ML Prediction (compiled NumPy forest, well under a millisecond, so no stage or timeout)
+    try:
+        predictor = model_registry.get("engagement_model")
+        score = predictor.predict([draft_post])[0]
+        ml = round(min(score, 99.0), 1), round(random.uniform(30, 85), 1) # Fallback clarity math
+    except Exception:
+        ml = None
+
+    critique = stream_job(job, critique_stream)
+    rewrite = stream_job(job, rewrite_stream)
+    return {"ml": ml, "critique": critique, "rewrite": rewrite}
+
+def store_analysis(analysis):
+    if analysis["ml"] is None:
+        st.session_state.sc_score = 45.0
+        st.session_state.sc_clarity = 30.0
+        st.toast("ML Model Offline. Using fallback metrics.")
+    else:
+        st.session_state.sc_score, st.session_state.sc_clarity = analysis["ml"]
+    st.session_state.sc_critique = analysis["critique"]
+    st.session_state.sc_rewritten = analysis["rewrite"]
 
-# 5. Intelligence Engine
 if analyze_btn:
     if not draft_post:
         st.warning("Do not be lazy. Provide a draft post first.")
     else:
-        with st.spinner("Running ML prediction and generating AI rewrite..."):
-            
-            # Phase A: ML Prediction
-            try:
-                pipeline = joblib.load('ml_models/engagement_model.pkl')
-                score = pipeline.predict([draft_post])[0]
-                st.session_state.sc_score = round(min(score, 99.0), 1)
-                st.session_state.sc_clarity = round(np.random.uniform(30, 85), 1) # Fallback clarity math
-            except Exception as e:
-                st.session_state.sc_score = 45.0
-                st.session_state.sc_clarity = 30.0
-                st.toast("ML Model Offline. Using fallback metrics.")
-
-            # Phase B: AI Critique
-            critique_prompt = f"You are a strict technical recruiter. Critique this LinkedIn draft for a {target_role}: '{draft_post}'. Give 3 harsh bullet points on why it is weak. Be concise."
-            st.session_state.sc_critique = get_gemini_response(critique_prompt)
-
-            # Phase C: AI Contextual Rewrite
-            rewrite_prompt = f"""
-            You are an expert LinkedIn copywriter. The user is a {target_role} aiming to work at {target_eco}. 
-            Their preferred personal branding tone is: {voice_tone}.
-            
-            Rewrite the following draft. Preserve the core meaning and intent, but elevate the professional quality, add structure, and make it highly engaging for tech recruiters.
-            
-            Draft to rewrite: {draft_post}
-            """
-            
-            # Inject iterative memory
-            if st.session_state.scorecard_refinements:
-                rewrite_prompt += f"\n\nCRITICAL INSTRUCTION: Adjust the rewrite strictly based on this previous user feedback: {st.session_state.scorecard_refinements[-1]}"
-            
-            st.session_state.sc_rewritten = get_gemini_response(rewrite_prompt)
-            st.rerun()
+        # Phase B: AI Critique
+        critique_prompt = f"You are a strict technical recruiter. Critique this LinkedIn draft for a {target_role}: '{draft_post}'. Give 3 harsh bullet points on why it is weak. Be concise."
+
+        # Phase C: AI Contextual Rewrite
+        rewrite_prompt = f"""
+        You are an expert LinkedIn copywriter. The user is a {target_role} aiming to work at {target_eco}. 
+        Their preferred personal branding tone is: {voice_tone}.
+        
+        Rewrite the following draft. Preserve the core meaning and intent, but elevate the professional quality, add structure, and make it highly engaging for tech recruiters.
+        
+        Draft to rewrite: {draft_post}
+        """
+        
+        # Inject iterative memory
+        if st.session_state.scorecard_refinements:
+            rewrite_prompt += f"\n\nCRITICAL INSTRUCTION: Adjust the rewrite strictly based on this previous user feedback: {st.session_state.scorecard_refinements[-1]}"
+        
+        try:
+            st.session_state.scorecard_job = submit_job(user_id, "post_analysis", analyze_draft, draft_post, critique_prompt, rewrite_prompt)
+        except JobQueueFull as e:
+            st.warning(str(e))
+        else:
+            follow_job("scorecard_job", "Running ML prediction and generating AI rewrite", store_analysis)
+
+if st.session_state.get("scorecard_job"):
+    job_status("scorecard_job", "Running ML prediction and generating AI rewrite", store_analysis)
+analysis_error = pop_job_error("scorecard_job")
+if analysis_error:
+    st.error(f"Analysis failed: {analysis_error}")
+
+# Feedback controls rerun on their own, so typing a refinement doesn't redraw the analysis
+@st.fragment
+def rewrite_feedback():
+    # --- Deliverable 3 Feedback Loop ---
+    st.write("---")
+    st.write("**AI Alignment Feedback:**")
+    fb_col1, fb_col2 = st.columns(2)
+    
+    with fb_col1:
+        if st.button("👍 Perfect, I'll post it", use_container_width=True):
+            log_feedback(user_id, "Viral Scorecard Rewrite", True)
+            st.success("Feedback logged! Post it on LinkedIn.")
+            st.session_state.sc_rewritten = None
+            st.session_state.scorecard_refinements = []
+                
+    with fb_col2:
+        with st.popover("👎 Needs Changes (Iterate)", use_container_width=True):
+            refinement = st.text_input("What should I change? (e.g., 'Make it shorter', 'Use fewer hashtags')")
+            if st.button("Log Feedback & Regenerate", key="regen_post"):
+                if refinement:
+                    st.session_state.scorecard_refinements.append(refinement)
+                    log_feedback(user_id, "Viral Scorecard Rewrite", False, refinement)
+                    st.info("Feedback logged. Click 'Analyze & Rewrite Post' above to apply changes.")
+                else:
+                    st.warning("Specify what to change.")
 
 # 6. Output & Feedback Loop Dashboard
 if st.session_state.sc_rewritten:
@@ -129,41 +183,4 @@ if st.session_state.sc_rewritten:
             st.markdown(f"**Tailored for:** `{target_role}` | **Tone:** `{voice_tone}`")
             st.text_area("Copy your new post:", value=st.session_state.sc_rewritten, height=250)
             
-            # --- Deliverable 3 Feedback Loop ---
-            st.write("---")
-            st.write("**AI Alignment Feedback:**")
-            fb_col1, fb_col2 = st.columns(2)
-            
-            with fb_col1:
-                if st.button("👍 Perfect, I'll post it", use_container_width=True):
-                    try:
-                        supabase.table("feedback_history").insert({
-                            "user_id": user_id,
-                            "feature_name": "Viral Scorecard Rewrite",
-                            "is_helpful": True,
-                            "missing_element": "None"
-                        }).execute()
-                        st.success("Feedback logged! Post it on LinkedIn.")
-                        st.session_state.sc_rewritten = None
-                        st.session_state.scorecard_refinements = []
-                    except Exception as e:
-                        st.error(f"DB Error: {e}")
-                        
-            with fb_col2:
-                with st.popover("👎 Needs Changes (Iterate)", use_container_width=True):
-                    refinement = st.text_input("What should I change? (e.g., 'Make it shorter', 'Use fewer hashtags')")
-                    if st.button("Log Feedback & Regenerate", key="regen_post"):
-                        if refinement:
-                            st.session_state.scorecard_refinements.append(refinement)
-                            try:
-                                supabase.table("feedback_history").insert({
-                                    "user_id": user_id,
-                                    "feature_name": "Viral Scorecard Rewrite",
-                                    "is_helpful": False,
-                                    "missing_element": refinement
-                                }).execute()
-                            except:
-                                pass
-                            st.info("Feedback logged. Click 'Analyze & Rewrite Post' above to apply changes.")
-                        else:
-                            st.warning("Specify what to change.")
\ No newline at end of file
+            rewrite_feedback()
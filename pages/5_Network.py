@@ -1,13 +1,13 @@
 import streamlit as st
-import requests
-import json
 import urllib.parse
-from core.database import supabase
-from utils.engine import get_gemini_response
-from core.key_manager import key_manager
+from core.feedback import log_feedback
+from utils.engine import get_gemini_response, get_gemini_responses, get_gemini_json
+from utils.prompts import build_pitch_prompt, build_batch_pitch_prompt, build_search_query_prompt
+from utils.query_table import lookup_query, SEARCH_STRATEGIES
+from utils.search import search_serper
+from utils.jobs import JobQueueFull, follow_job, job_status, pop_job_error, submit_job
 from core.auth import logout_user
-from core.auth import logout_user
-from core.cache import force_clear_cache
+from core.cache import get_user_context, invalidate_user
 
 # 1. Security Check
 if not st.session_state.get("authenticated", False):
@@ -29,7 +29,7 @@ with st.sidebar:
     
     # The Manual Clear Cache Button
     if st.button("🔄 Sync Data (Clear Cache)", use_container_width=True):
-        force_clear_cache()
+        invalidate_user(user_id)
         st.success("Cache cleared. Data synced.")
         st.rerun()
         
@@ -45,14 +45,13 @@ if "network_refinements" not in st.session_state:
     st.session_state.network_refinements = []
 
 # 3. Fetch User Context from Cache
-from core.cache import get_cached_profile
 user_id = st.session_state["user"].id
 try:
-    profile_data = get_cached_profile(user_id)
-    if not profile_data:
+    context = get_user_context(user_id)
+    if not context:
         st.error("Profile data missing. Please complete Onboarding.")
         st.stop()
-    user_profile = profile_data[0]
+    user_profile = context["profile"]
     target_role = user_profile['target_role']
     target_eco = user_profile['target_ecosystem']
 except Exception as e:
@@ -61,77 +60,112 @@ except Exception as e:
 
 # 4. Agentic Search Logic
 def search_mentors(role, eco, strategy):
-    # Phase 1: AI generates optimal search query
-    query_prompt = f"Generate a strict Google search query to find LinkedIn profiles of professionals. Target: {role} at {eco}. Strategy: {strategy}. Return ONLY the search string, no quotes. Example: site:linkedin.com/in/ 'Senior Software Engineer' 'Google'."
-    search_query = get_gemini_response(query_prompt).strip()
+    # Phase 1: Precomputed query table (zero latency); AI generates the query only for unknown combinations
+    search_query = lookup_query(role, eco, strategy)
+    if not search_query:
+        search_query = get_gemini_response(build_search_query_prompt(role, eco, strategy), profile="search_query", hedge=True).strip()
     
-    # Phase 2: Serper.ai execution via Round Robin
+    # Phase 2: Serper.ai execution, served from the shared result cache when possible.
+    # Runs inside a background job, so failures are raised for the status panel to show
     try:
-        serper_key = key_manager.get_next_serper_key()
+        return search_serper(search_query, num=1) # Fetch 4 profiles for a good UI grid
+    except ValueError:
+        raise
     except Exception as e:
-        st.error(str(e))
-        return None
-
-    url = "https://google.serper.dev/search"
-    payload = json.dumps({"q": search_query, "num": 1}) # Fetch 4 profiles for a good UI grid
-    headers = {
-        'X-API-KEY': serper_key,
-        'Content-Type': 'application/json'
-    }
+        raise RuntimeError(f"Network request failed: {e}") from e
+
+def generate_pitches(mentors, role, tone, refinement=None):
+    """
+    Asks for every pitch in a single structured (JSON) response. Any mentor missing
+    from a malformed or incomplete batch falls back to an individual concurrent call.
+    """
+    pitches = [None] * len(mentors)
+
+    # Short, latency-sensitive calls: hedged across keys when they hit the tail
+    batch = get_gemini_json(build_batch_pitch_prompt(mentors, role, tone, refinement), profile="pitch_batch", hedge=True)
+    if isinstance(batch, dict):
+        # Tolerate a wrapped array, e.g. {"pitches": [...]}
+        batch = next((v for v in batch.values() if isinstance(v, list)), None)
+    if isinstance(batch, list):
+        for item in batch:
+            if not isinstance(item, dict):
+                continue
+            idx, pitch = item.get("index"), item.get("pitch")
+            if isinstance(idx, int) and 0 <= idx < len(mentors) and isinstance(pitch, str) and pitch.strip():
+                pitches[idx] = pitch.strip()
+
+    missing = [i for i, pitch in enumerate(pitches) if pitch is None]
+    if missing:
+        fallback = get_gemini_responses(
+            [build_pitch_prompt(mentors[i], role, tone, refinement) for i in missing],
+            placeholder="Pitch unavailable right now. Try regenerating.",
+            profile="pitch",
+            hedge=True,
+        )
+        for i, pitch in zip(missing, fallback):
+            pitches[i] = pitch
+    return pitches
+
+def find_mentors(job, role, eco, strategy, tone, refinement=None):
+    """Job body: search, parse the results into mentor cards and attach their pitches."""
+    job.update("Searching for matching leaders...")
+    raw_mentors = search_mentors(role, eco, strategy)
+    if not raw_mentors:
+        raise RuntimeError("Search Engine API failed. Check your Serper API keys.")
+
+    mentors = []
+    for m in raw_mentors:
+        raw_title = m.get('title', 'LinkedIn Member').replace('- LinkedIn', '').strip()
+        # Parse Name and Role from Google Title
+        title_parts = raw_title.split(' - ')
+        name = title_parts[0] if len(title_parts) > 0 else "Professional"
+        role_info = " - ".join(title_parts[1:]) if len(title_parts) > 1 else "Industry Professional"
     
-    try:
-        response = requests.request("POST", url, headers=headers, data=payload)
-        return response.json().get('organic', [])
-    except Exception as e:
-        st.error(f"Network request failed: {e}")
-        return None
-
-# 5. UI Preferences & Generation
-with st.container(border=True):
-    st.write("**Step 1: Set Networking Strategy**")
-    col_s1, col_s2 = st.columns(2)
-    with col_s1:
-        net_strategy = st.selectbox("Search Focus", ["Direct Role Match (Seniors)", "Technical Recruiters / HR", "Startup Founders / CTOs"])
-    with col_s2:
-        pitch_tone = st.selectbox("Pitch Tone", ["Curious Student", "Aggressive Value-Add", "Polite & Professional"])
+        mentors.append({
+            "name": name,
+            "role": role_info,
+            "link": m.get('link', '#'),
+            "snippet": m.get('snippet', 'No snippet available.'),
+            "pitch": None
+        })
+
+    # AI Pitch Generation (one batched call, per-item fallback)
+    job.update(f"Found {len(mentors)} leaders. Writing personalized pitches...")
+    pitches = generate_pitches(mentors, role, tone, refinement)
+    for mentor, pitch in zip(mentors, pitches):
+        mentor["pitch"] = pitch
+    return mentors
+
+def store_mentors(mentors):
+    st.session_state.live_mentors = mentors
+
+# 5. UI Preferences & Generation (fragment: changing the strategy or tone doesn't redraw the cards)
+@st.fragment
+def mentor_search():
+    with st.container(border=True):
+        st.write("**Step 1: Set Networking Strategy**")
+        col_s1, col_s2 = st.columns(2)
+        with col_s1:
+            net_strategy = st.selectbox("Search Focus", SEARCH_STRATEGIES)
+        with col_s2:
+            pitch_tone = st.selectbox("Pitch Tone", ["Curious Student", "Aggressive Value-Add", "Polite & Professional"])
         
-    if st.button("Find Matching Mentors", type="primary", use_container_width=True):
-        with st.spinner("Executing Real-Time RAG Pipeline via Google Search..."):
-            raw_mentors = search_mentors(target_role, target_eco, net_strategy)
-            
-            if not raw_mentors:
-                st.error("Search Engine API failed. Check your Serper API keys.")
+        if st.button("Find Matching Mentors", type="primary", use_container_width=True, disabled=bool(st.session_state.get("network_job"))):
+            # Search and pitch generation run in the background job pool; progress is
+            # followed here while the user stays, the status panel below covers returns
+            refinement = st.session_state.network_refinements[-1] if st.session_state.network_refinements else None
+            try:
+                st.session_state.network_job = submit_job(user_id, "mentor_search", find_mentors, target_role, target_eco, net_strategy, pitch_tone, refinement)
+            except JobQueueFull as e:
+                st.warning(str(e))
             else:
-                st.session_state.live_mentors = [] # Clear old results
-                
-                for m in raw_mentors:
-                    raw_title = m.get('title', 'LinkedIn Member').replace('- LinkedIn', '').strip()
-                    # Parse Name and Role from Google Title
-                    title_parts = raw_title.split(' - ')
-                    name = title_parts[0] if len(title_parts) > 0 else "Professional"
-                    role_info = " - ".join(title_parts[1:]) if len(title_parts) > 1 else "Industry Professional"
-                    
-                    link = m.get('link', '#')
-                    snippet = m.get('snippet', 'No snippet available.')
-                    
-                    # AI Pitch Generation
-                    pitch_prompt = f"Write a 1-sentence personalized LinkedIn connection request pitch to {name}, who is a {role_info}. The user is a student aiming for a {target_role} role. Tone: {pitch_tone}. Context from their profile: '{snippet}'. Keep it under 20 words."
-                    
-                    if st.session_state.network_refinements:
-                        pitch_prompt += f" Apply this feedback to the pitch: {st.session_state.network_refinements[-1]}"
-                        
-                    pitch = get_gemini_response(pitch_prompt)
-                    
-                    st.session_state.live_mentors.append({
-                        "name": name,
-                        "role": role_info,
-                        "link": link,
-                        "pitch": pitch
-                    })
-                st.rerun()
-
-# 6. Result Dashboard & Feedback Loop
-if st.session_state.live_mentors:
+                follow_job("network_job", "Executing Real-Time RAG Pipeline via Google Search", store_mentors)
+
+# 6. Result Dashboard & Feedback Loop (fragment: feedback clicks don't rerun the search panel)
+@st.fragment
+def mentor_cards():
+    if not st.session_state.live_mentors:
+        return
     st.divider()
     st.subheader(f"📡 Discovered {len(st.session_state.live_mentors)} Active Leaders")
     
@@ -156,16 +190,8 @@ if st.session_state.live_mentors:
                     st.link_button("View Profile", mentor['link'], use_container_width=True)
                 with act_col2:
                     if st.button("👍 Good Pitch", key=f"good_{i}", use_container_width=True):
-                        try:
-                            supabase.table("feedback_history").insert({
-                                "user_id": user_id,
-                                "feature_name": "Connection Hub Pitch",
-                                "is_helpful": True,
-                                "missing_element": "None"
-                            }).execute()
-                            st.toast("Feedback logged!")
-                        except:
-                            pass
+                        log_feedback(user_id, "Connection Hub Pitch", True)
+                        st.toast("Feedback logged!")
 
     # Universal RAG Feedback
     st.write("---")
@@ -174,13 +200,13 @@ if st.session_state.live_mentors:
         if st.button("Log Feedback"):
             if refinement:
                 st.session_state.network_refinements.append(refinement)
-                try:
-                    supabase.table("feedback_history").insert({
-                        "user_id": user_id,
-                        "feature_name": "Connection Hub Pitch",
-                        "is_helpful": False,
-                        "missing_element": refinement
-                    }).execute()
-                except:
-                    pass
-                st.info("Feedback logged. Click 'Find Matching Mentors' to generate a new batch with these rules.")
\ No newline at end of file
+                log_feedback(user_id, "Connection Hub Pitch", False, refinement)
+                st.info("Feedback logged. Click 'Find Matching Mentors' to generate a new batch with these rules.")
+
+mentor_search()
+if st.session_state.get("network_job"):
+    job_status("network_job", "Executing Real-Time RAG Pipeline via Google Search", store_mentors)
+search_error = pop_job_error("network_job")
+if search_error:
+    st.error(search_error)
+mentor_cards()
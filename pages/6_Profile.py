@@ -1,7 +1,7 @@
 import streamlit as st
-import time
-from core.database import supabase
 from core.auth import logout_user
+from core.cache import get_user_context
+from core.profiles import save_user_context
 
 # 1. Security Check
 if not st.session_state.get("authenticated", False):
@@ -24,17 +24,16 @@ with st.sidebar:
 st.title("⚙️ Profile & Skill Settings")
 st.write("Update your career trajectory. The AI will immediately adapt your roadmaps and scores.")
 
-# 3. Fetch Current Data
+# 3. Fetch Current Data (one request, shared with the other pages' cache)
 try:
-    prof_res = supabase.table("profiles").select("*").eq("id", user_id).execute()
-    skill_res = supabase.table("skill_matrix").select("*").eq("id", user_id).execute()
+    context = get_user_context(user_id)
     
-    if not prof_res.data or not skill_res.data:
+    if not context or not context["skills"]:
         st.error("Data missing. Please return to onboarding.")
         st.stop()
         
-    p_data = prof_res.data[0]
-    s_data = skill_res.data[0]
+    p_data = context["profile"]
+    s_data = context["skills"]
 except Exception as e:
     st.error(f"Database Error: {e}")
     st.stop()
@@ -76,26 +75,21 @@ with st.form("edit_master_form"):
     if submitted:
         with st.spinner("Syncing to database..."):
             try:
-                # Update Profiles
-                supabase.table("profiles").update({
+                # Both records in one atomic call; the returned record is written through to
+                # the cache, and the form already shows the saved values, so no rerun is needed
+                save_user_context(user_id, profile={
                     "target_role": new_role,
                     "target_ecosystem": new_eco,
                     "voice_tone": new_tone
-                }).eq("id", user_id).execute()
-                
-                # Update Skills
-                supabase.table("skill_matrix").update({
+                }, skills={
                     "dsa": new_dsa,
                     "oops": new_oops,
                     "dbms": new_dbms,
                     "os": new_os,
                     "system_design": new_sys
-                }).eq("id", user_id).execute()
+                })
                 
-                # Show success message and pause before refreshing
                 st.success("✅ Profile and Skills updated successfully! Dashboard metrics recalculated.")
-                time.sleep(1.5) 
-                st.rerun()
-                
+
             except Exception as e:
                 st.error(f"Update failed: {e}")
\ No newline at end of file
@@ -0,0 +1,13 @@
+-- One-row-per-user view joining the profile with its skill matrix, so pages can
+-- load their whole user context in a single PostgREST request.
+-- security_invoker keeps the Row Level Security policies of profiles/skill_matrix in force.
+create or replace view public.user_context
+with (security_invoker = on) as
+select
+    p.id,
+    to_jsonb(p) as profile,
+    to_jsonb(s) as skills
+from public.profiles p
+left join public.skill_matrix s on s.id = p.id;
+
+grant select on public.user_context to authenticated;
@@ -0,0 +1,56 @@
+-- Writes a user's profile and skill matrix in one transaction and returns the
+-- fresh user_context row, so onboarding and profile edits are a single round trip.
+-- Keys missing from p_profile / p_skills keep their stored value.
+-- security invoker: the Row Level Security policies of both tables still apply.
+create or replace function public.upsert_user_context(p_user_id uuid, p_profile jsonb, p_skills jsonb)
+returns jsonb
+language plpgsql
+security invoker
+as $$
+declare
+    result jsonb;
+begin
+    insert into public.profiles as p (id, college_year, target_role, target_ecosystem, voice_tone)
+    values (
+        p_user_id,
+        p_profile->>'college_year',
+        p_profile->>'target_role',
+        p_profile->>'target_ecosystem',
+        p_profile->>'voice_tone'
+    )
+    on conflict (id) do update set
+        college_year = coalesce(excluded.college_year, p.college_year),
+        target_role = coalesce(excluded.target_role, p.target_role),
+        target_ecosystem = coalesce(excluded.target_ecosystem, p.target_ecosystem),
+        voice_tone = coalesce(excluded.voice_tone, p.voice_tone);
+
+    insert into public.skill_matrix as s (id, dsa, oops, dbms, os, system_design, project_depth, branding_confidence)
+    values (
+        p_user_id,
+        (p_skills->>'dsa')::int,
+        (p_skills->>'oops')::int,
+        (p_skills->>'dbms')::int,
+        (p_skills->>'os')::int,
+        (p_skills->>'system_design')::int,
+        p_skills->>'project_depth',
+        (p_skills->>'branding_confidence')::int
+    )
+    on conflict (id) do update set
+        dsa = coalesce(excluded.dsa, s.dsa),
+        oops = coalesce(excluded.oops, s.oops),
+        dbms = coalesce(excluded.dbms, s.dbms),
+        os = coalesce(excluded.os, s.os),
+        system_design = coalesce(excluded.system_design, s.system_design),
+        project_depth = coalesce(excluded.project_depth, s.project_depth),
+        branding_confidence = coalesce(excluded.branding_confidence, s.branding_confidence);
+
+    select jsonb_build_object('profile', c.profile, 'skills', c.skills)
+    into result
+    from public.user_context c
+    where c.id = p_user_id;
+
+    return result;
+end;
+$$;
+
+grant execute on function public.upsert_user_context(uuid, jsonb, jsonb) to authenticated;
@@ -0,0 +1,242 @@
+import argparse
+import hashlib
+import io
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import streamlit as st
+from core.outbound import request
+from utils.prompts import build_banner_prompt
+from utils.query_table import TARGET_ROLES
+
+logger = logging.getLogger(__name__)
+
+BANNER_STYLES = ["Professional Blue Tech Modern", "Dark Mode Minimalist", "Creative Startup Vibrant", "Corporate Abstract"]
+
+# LinkedIn background banner size
+BANNER_SIZE = (1584, 396)
+
+# (base, secondary, accent) RGB palette per target role for the local renderer
+ROLE_PALETTES = {
+    "SDE": ((15, 23, 42), (37, 99, 235), (16, 185, 129)),
+    "ML Engineer": ((24, 16, 48), (124, 58, 237), (236, 72, 153)),
+    "Data Scientist": ((12, 30, 40), (8, 145, 178), (250, 204, 21)),
+    "DevOps": ((20, 24, 32), (234, 88, 12), (59, 130, 246)),
+    "Full Stack": ((16, 24, 40), (14, 165, 233), (168, 85, 247)),
+    "Competitive Programmer": ((10, 10, 20), (220, 38, 38), (245, 158, 11)),
+}
+DEFAULT_PALETTE = ROLE_PALETTES["SDE"]
+
+DEFAULT_BANNER_API_URL = "https://router.huggingface.co/hf-inference/models/stabilityai/stable-diffusion-xl-base-1.0"
+BANNER_CACHE_DIR = ".cache/banners"
+
+# Cached banners older than this are still served, but regenerated in the background
+BANNER_REFRESH_AGE = 7 * 24 * 60 * 60
+
+_refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="banner-refresh")
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+def _api_url():
+    # BANNER_API_URL lets tests and local runs point at the stand-in service (see --serve)
+    return st.secrets.get("BANNER_API_URL", DEFAULT_BANNER_API_URL)
+
+def _content_address(api_url, prompt):
+    return hashlib.sha256(f"{api_url}\n{prompt}".encode("utf-8")).hexdigest()
+
+def _cache_path(address):
+    return os.path.join(BANNER_CACHE_DIR, f"{address}.img")
+
+def _generate_remote(api_url, prompt):
+    # Pooled Hugging Face session; timeouts and the circuit breaker live in core.outbound
+    headers = {"Authorization": f"Bearer {st.secrets.get('HF_TOKEN_1')}"}
+    response = request("huggingface", "POST", api_url, headers=headers, json={"inputs": prompt})
+    if response.status_code != 200:
+        raise RuntimeError(f"Image API Error: {response.status_code}. The model might be loading.")
+    return response.content
+
+def _store(address, image_bytes):
+    os.makedirs(BANNER_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{_cache_path(address)}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(image_bytes)
+    os.replace(tmp_path, _cache_path(address))
+
+def _refresh(api_url, prompt, address):
+    try:
+        _store(address, _generate_remote(api_url, prompt))
+    except Exception as e:
+        logger.warning("background refresh failed: %s", e)
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(address)
+
+def get_banner(target_role, banner_style):
+    """
+    Returns encoded image bytes for (role, style). Banners are content-addressed
+    by endpoint + prompt, so a cached file is served instantly; stale files trigger
+    a background refresh. Only a cold miss waits on the diffusion endpoint.
+    """
+    api_url = _api_url()
+    prompt = build_banner_prompt(target_role, banner_style)
+    address = _content_address(api_url, prompt)
+    path = _cache_path(address)
+
+    try:
+        with open(path, "rb") as f:
+            image_bytes = f.read()
+    except OSError:
+        image_bytes = _generate_remote(api_url, prompt)
+        _store(address, image_bytes)
+        return image_bytes
+
+    if time.time() - os.path.getmtime(path) > BANNER_REFRESH_AGE:
+        with _refresh_lock:
+            start_refresh = address not in _refreshing
+            _refreshing.add(address)
+        if start_refresh:
+            _refresh_pool.submit(_refresh, api_url, prompt, address)
+    return image_bytes
+
+# Smooth background layers are computed at 1/BACKGROUND_SCALE resolution and upscaled
+BACKGROUND_SCALE = 4
+
+def _linear_gradient(width, height, start, end, angle):
+    """Vectorized two-colour gradient along `angle` (radians) as an HxWx3 float array."""
+    import numpy as np
+    ys = np.arange(height, dtype=np.float32)[:, None]
+    xs = np.arange(width, dtype=np.float32)[None, :]
+    t = xs * np.cos(angle) / width + ys * np.sin(angle) / height
+    t = (t - t.min()) / max(t.max() - t.min(), 1e-6)
+    start, end = np.array(start, np.float32), np.array(end, np.float32)
+    return start + t[..., None] * (end - start)
+
+def _radial_glow(canvas, center, radius, color, strength):
+    import numpy as np
+    height, width, _ = canvas.shape
+    ys, xs = np.ogrid[0:height, 0:width]
+    dist = np.sqrt((xs - center[0]) ** 2 + (ys - center[1]) ** 2) / radius
+    weight = (np.clip(1.0 - dist, 0.0, 1.0) ** 2 * strength)[..., None]
+    canvas += weight * (np.array(color, np.float32) - canvas)
+
+@lru_cache(maxsize=64)
+def render_banner(target_role, banner_style, fmt="WEBP"):
+    """
+    Local procedural banner: NumPy gradients plus PIL shapes at LinkedIn's
+    1584x396 size, parameterised by style and a role-derived palette. No network,
+    no GPU; returns encoded bytes that st.image can display as-is.
+    """
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    width, height = BANNER_SIZE
+    w, h = width // BACKGROUND_SCALE, height // BACKGROUND_SCALE
+    base, secondary, accent = ROLE_PALETTES.get(target_role, DEFAULT_PALETTE)
+    rng = np.random.default_rng(int(hashlib.sha256(f"{target_role}|{banner_style}".encode("utf-8")).hexdigest()[:8], 16))
+
+    if banner_style == "Dark Mode Minimalist":
+        canvas = _linear_gradient(w, h, (8, 10, 16), base, 0.2)
+        _radial_glow(canvas, (w * 0.82, h * 0.5), h * 1.4, secondary, 0.35)
+    elif banner_style == "Creative Startup Vibrant":
+        canvas = _linear_gradient(w, h, secondary, accent, 0.6)
+        for _ in range(5):
+            center = (rng.uniform(0, w), rng.uniform(0, h))
+            _radial_glow(canvas, center, rng.uniform(0.4, 0.9) * h, tuple(rng.integers(0, 256, 3)), 0.55)
+    elif banner_style == "Corporate Abstract":
+        canvas = _linear_gradient(w, h, base, secondary, 1.2)
+    else:  # Professional Blue Tech Modern
+        canvas = _linear_gradient(w, h, base, (30, 64, 175), 0.0)
+        _radial_glow(canvas, (w * 0.75, h * 0.3), h * 1.2, secondary, 0.45)
+
+    background = Image.fromarray(np.clip(canvas, 0, 255).astype(np.uint8), "RGB")
+    image = background.resize(BANNER_SIZE, Image.BILINEAR)
+    draw = ImageDraw.Draw(image, "RGBA")
+
+    if banner_style == "Dark Mode Minimalist":
+        draw.line([(width * 0.55, height * 0.78), (width * 0.95, height * 0.78)], fill=accent + (200,), width=3)
+        draw.ellipse([width * 0.9 - 6, height * 0.78 - 6, width * 0.9 + 6, height * 0.78 + 6], fill=accent + (255,))
+    elif banner_style == "Creative Startup Vibrant":
+        for _ in range(14):
+            x, y, r = rng.uniform(0, width), rng.uniform(0, height), rng.uniform(8, 60)
+            draw.ellipse([x - r, y - r, x + r, y + r], outline=(255, 255, 255, 90), width=2)
+    elif banner_style == "Corporate Abstract":
+        for i in range(6):
+            x0 = width * (0.35 + 0.11 * i)
+            band = [(x0, 0), (x0 + width * 0.08, 0), (x0 - width * 0.1, height), (x0 - width * 0.18, height)]
+            draw.polygon(band, fill=(accent if i % 2 else secondary) + (int(40 + 18 * i),))
+    else:
+        # Circuit-style grid with a few lit nodes on the right half
+        step = 44
+        for x in range(width // 2, width, step):
+            draw.line([(x, 0), (x, height)], fill=(255, 255, 255, 18))
+        for y in range(0, height, step):
+            draw.line([(width // 2, y), (width, y)], fill=(255, 255, 255, 18))
+        for _ in range(18):
+            x = width // 2 + step * int(rng.integers(0, (width // 2) // step))
+            y = step * int(rng.integers(0, height // step))
+            draw.ellipse([x - 4, y - 4, x + 4, y + 4], fill=accent + (230,))
+
+    buffer = io.BytesIO()
+    if fmt == "WEBP":
+        image.save(buffer, format="WEBP", quality=85, method=0)
+    else:
+        image.save(buffer, format=fmt, compress_level=1)
+    return buffer.getvalue()
+
+def warm_banner_cache(force=False):
+    """Offline warm-up job: renders every role x style combination into the cache."""
+    api_url = _api_url()
+    combos = list(itertools.product(TARGET_ROLES, BANNER_STYLES))
+    print(f"Warming banner cache ({len(combos)} combinations) via {api_url}...")
+    for role, style in combos:
+        prompt = build_banner_prompt(role, style)
+        address = _content_address(api_url, prompt)
+        if not force and os.path.exists(_cache_path(address)):
+            continue
+        try:
+            _store(address, _generate_remote(api_url, prompt))
+            print(f"✅ {role} / {style}")
+        except Exception as e:
+            print(f"⚠️ {role} / {style}: {e}")
+
+def serve_stand_in(port=8765):
+    """Local stand-in for the diffusion endpoint: answers every POST with a PNG."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from PIL import Image
+
+    class StandInImageHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            seed = hashlib.sha256(self.rfile.read(length)).digest()
+            image = Image.new("RGB", BANNER_SIZE, tuple(seed[:3]))
+            buffer = io.BytesIO()
+            image.save(buffer, format="PNG")
+
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(buffer.tell()))
+            self.end_headers()
+            self.wfile.write(buffer.getvalue())
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"Stand-in image service on http://127.0.0.1:{port}/ (set BANNER_API_URL to this address)")
+    ThreadingHTTPServer(("127.0.0.1", port), StandInImageHandler).serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Banner Studio cache tools.")
+    parser.add_argument("--warm", action="store_true", help="Pre-render every role x style banner into the cache.")
+    parser.add_argument("--force", action="store_true", help="With --warm, regenerate banners that are already cached.")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Run the local stand-in image service.")
+    args = parser.parse_args()
+    if args.serve:
+        serve_stand_in(args.serve)
+    elif args.warm:
+        warm_banner_cache(force=args.force)
+    else:
+        parser.print_help()
@@ -0,0 +1,82 @@
+import argparse
+import ast
+import glob
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+START_MARKER = "--bench-imports-start--"
+
+# Cold import budget per page in milliseconds (module-level imports only)
+DEFAULT_BUDGET_MS = 1500
+PAGE_BUDGETS_MS = {}
+
+def page_imports(path):
+    """Module-level import statements of a page, as source lines."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+def measure_page(path, python=sys.executable):
+    """
+    Runs the page's imports in a fresh interpreter under -X importtime.
+    Returns (total_ms, [(cumulative_ms, module)] for top-level imports, failures).
+    """
+    lines = ["import sys", f"sys.stderr.write({START_MARKER!r} + '\\n')"]
+    for statement in page_imports(path):
+        lines += [
+            "try:",
+            f"    {statement}",
+            "except Exception as e:",
+            f"    print({statement!r} + ' -> ' + type(e).__name__)",
+        ]
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", "\n".join(lines)],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+
+    modules = []
+    started = False
+    for line in result.stderr.splitlines():
+        if line == START_MARKER:
+            started = True
+            continue
+        if not started or not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented under their parent; only top-level entries add up to the total
+        if not name[1:].startswith(" "):
+            modules.append((int(cumulative) / 1000, name.strip()))
+
+    failures = [line for line in result.stdout.splitlines() if " -> " in line]
+    return sum(ms for ms, _ in modules), sorted(modules, reverse=True), failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold import-time report per page, failing when a page exceeds its budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=5, help="Heaviest top-level imports to list per page.")
+    parser.add_argument("--python", default=sys.executable, help="Interpreter with the app's requirements installed.")
+    args = parser.parse_args()
+
+    pages = ["app.py"] + sorted(glob.glob("pages/*.py", root_dir=REPO_ROOT))
+    over_budget = []
+    for page in pages:
+        total_ms, modules, failures = measure_page(os.path.join(REPO_ROOT, page), args.python)
+        budget = PAGE_BUDGETS_MS.get(page, args.budget_ms)
+        status = "OK  " if total_ms <= budget else "OVER"
+        print(f"{status} {page:<24} {total_ms:8.1f} ms  (budget {budget:.0f} ms)")
+        for ms, name in modules[:args.top]:
+            print(f"       {ms:8.1f} ms  {name}")
+        for failure in failures:
+            print(f"       ⚠️ {failure}")
+        if total_ms > budget:
+            over_budget.append(page)
+
+    if over_budget:
+        print(f"\nImport budget exceeded: {', '.join(over_budget)}")
+        sys.exit(1)
+    print("\nAll pages within import budget.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import functools
+import logging
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+from core.cache import prime_user_context
+
+BENCH_USER = SimpleNamespace(id="bench-user", email="bench@example.com")
+BENCH_CONTEXT = {
+    "profile": {"id": BENCH_USER.id, "college_year": "3rd Year", "target_role": "SDE",
+                "target_ecosystem": "FAANG/Big Tech", "voice_tone": "Professional"},
+    "skills": {"id": BENCH_USER.id, "dsa": 3, "oops": 3, "dbms": 2, "os": 2, "system_design": 1,
+               "project_depth": "Two deployed web apps", "branding_confidence": 5},
+}
+BENCH_MENTORS = [
+    {"name": f"Mentor {i}", "role": "Senior Software Engineer at Example", "link": "https://example.com",
+     "snippet": "Building distributed systems.", "pitch": "Loved your talk on caching."}
+    for i in range(4)
+]
+
+# Results already on screen, so the feedback controls and mentor cards render
+PAGE_STATE = {
+    "pages/4_Scorecard.py": {"sc_rewritten": "Rewritten post", "sc_critique": "- Too vague", "sc_score": 52.0, "sc_clarity": 61.0},
+    "pages/5_Network.py": {"live_mentors": BENCH_MENTORS},
+}
+
+# page -> [(widget type, label, two values to alternate between, fragment expected to own the widget)]
+INTERACTIONS = {
+    "pages/2_Branding.py": [
+        ("text_area", "Current Headline", ["Student at RGUKT", "CSE Student | Python"], "profile_optimizer"),
+        ("selectbox", "Visual Style", ["Dark Mode Minimalist", "Corporate Abstract"], "banner_studio"),
+    ],
+    "pages/3_Skill_Gap.py": [
+        ("slider", "Timeline (Months)", [5, 2], "roadmap_generator"),
+        ("selectbox", "Learning Strategy", ["Strict FAANG Interview Prep", "Project-Heavy Execution"], "roadmap_generator"),
+    ],
+    "pages/4_Scorecard.py": [
+        ("text_input", "What should I change? (e.g., 'Make it shorter', 'Use fewer hashtags')", ["Shorter", "Fewer hashtags"], "rewrite_feedback"),
+    ],
+    "pages/5_Network.py": [
+        ("selectbox", "Pitch Tone", ["Aggressive Value-Add", "Curious Student"], "mentor_search"),
+        ("text_input", "How should the AI adjust the next batch of pitches?", ["Shorter", "More specific"], "mentor_cards"),
+    ],
+}
+
+_fragment_ms = defaultdict(list)
+
+def _install_fragment_timer():
+    """Wraps st.fragment so every fragment run records its duration by function name."""
+    real_fragment = st.fragment
+
+    def timing_fragment(func=None, **kwargs):
+        if func is None:
+            return lambda f: timing_fragment(f, **kwargs)
+
+        @functools.wraps(func)
+        def timed(*args, **inner_kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **inner_kwargs)
+            finally:
+                _fragment_ms[func.__name__].append((time.perf_counter() - start) * 1000)
+        return real_fragment(timed, **kwargs)
+
+    st.fragment = timing_fragment
+
+def _find_widget(at, widget_type, label):
+    for widget in getattr(at, widget_type):
+        if widget.label == label:
+            return widget
+    raise LookupError(f"no {widget_type} labelled {label!r}")
+
+def bench_page(page, repeats):
+    """
+    AppTest always re-executes the whole script, which is exactly what every
+    interaction cost before fragments. The fragment timer shows what the same
+    interaction costs now that only the owning fragment reruns.
+    """
+    # Pages must run under the app entrypoint so their sidebar page links resolve
+    at = AppTest.from_file(os.path.join(REPO_ROOT, "app.py"), default_timeout=60).switch_page(page)
+    at.session_state["authenticated"] = True
+    at.session_state["user"] = BENCH_USER
+    for key, value in PAGE_STATE.get(page, {}).items():
+        at.session_state[key] = value
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+
+    rows = []
+    for widget_type, label, values, fragment in INTERACTIONS[page]:
+        full_ms, frag_ms = [], []
+        for i in range(repeats):
+            _fragment_ms.clear()
+            _find_widget(at, widget_type, label).set_value(values[i % 2])
+            start = time.perf_counter()
+            at.run()
+            full_ms.append((time.perf_counter() - start) * 1000)
+            if fragment in _fragment_ms:
+                frag_ms.append(_fragment_ms[fragment][-1])
+        rows.append((label, statistics.median(full_ms), fragment if frag_ms else None,
+                     statistics.median(frag_ms) if frag_ms else None))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Rerun latency per widget interaction: full script vs owning fragment.")
+    parser.add_argument("--repeats", type=int, default=7)
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    logging.disable(logging.WARNING)  # Streamlit's bare-mode and deprecation warnings drown the report
+    _install_fragment_timer()
+    prime_user_context(BENCH_USER.id, BENCH_CONTEXT)
+
+    for page in INTERACTIONS:
+        print(page)
+        try:
+            rows = bench_page(page, args.repeats)
+        except Exception as e:
+            print(f"    ⚠️ could not run: {e}")
+            continue
+        for label, full_ms, fragment, frag_ms in rows:
+            scoped = f"{frag_ms:7.1f} ms  ({fragment})" if fragment else "    n/a  (full rerun)"
+            print(f"    {label[:40]:<40} full {full_ms:7.1f} ms   fragment {scoped}")
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,419 @@
-import google.generativeai as genai
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import streamlit as st
+from core.config import JOB_WORKERS, STAGES_PER_JOB
 from core.key_manager import key_manager
+from core.outbound import guarded
+from core.ttl_cache import TTLCache
 
-def get_gemini_response(prompt, temperature=0.7):
+logger = logging.getLogger(__name__)
+
+# Model tiers a generation profile can route to
+MODEL_TIERS = {
+    "lite": "gemini-2.5-flash-lite",
+    "standard": "gemini-2.5-flash",
+}
+DEFAULT_MODEL = MODEL_TIERS["lite"]
+
+# Per-feature generation profiles. Call sites pick one by name; the engine applies
+# the model tier, output-token cap and temperature to the request, enforces the
+# timeout as the request deadline, and counts responses slower than the latency
+# SLO (seconds). max_output_tokens=None leaves the model's own limit in place. The
+# standard tier is a thinking model (its reasoning counts against the cap), so
+# user-facing profiles stay on lite unless a measured quality gain justifies it.
+GENERATION_PROFILES = {
+    "default": {"tier": "lite", "max_output_tokens": None, "temperature": 0.7, "timeout": 60, "slo": None},
+    "search_query": {"tier": "lite", "max_output_tokens": 64, "temperature": 0.0, "timeout": 8, "slo": 2.0},
+    "pitch": {"tier": "lite", "max_output_tokens": 120, "temperature": 0.7, "timeout": 12, "slo": 3.0},
+    "pitch_batch": {"tier": "lite", "max_output_tokens": 1024, "temperature": 0.7, "timeout": 20, "slo": 6.0},
+    "critique": {"tier": "lite", "max_output_tokens": 300, "temperature": 0.7, "timeout": 30, "slo": 8.0},
+    "post_rewrite": {"tier": "lite", "max_output_tokens": 700, "temperature": 0.7, "timeout": 45, "slo": 12.0},
+    "profile_rewrite": {"tier": "lite", "max_output_tokens": 900, "temperature": 0.7, "timeout": 45, "slo": 10.0},  # headline + About (<= 2600 chars)
+    "roadmap": {"tier": "lite", "max_output_tokens": 512, "temperature": 0.7, "timeout": 30, "slo": 8.0},  # prompt asks for under 10 lines
+}
+
+# Concurrent requests allowed per pooled key when fanning out a batch of prompts
+DEFAULT_CONCURRENCY_PER_KEY = 2
+
+# Client pool: one transport per API key, one model wrapper per (key, model).
+# gRPC channels are thread-safe and keep their connections alive, so every
+# Streamlit script thread can share them.
+_transports = {}
+_models = {}
+_pool_lock = threading.Lock()
+
+# Process-wide response cache keyed on (model, prompt, temperature, output format, token cap)
+LLM_CACHE_MAX_BYTES = 32 * 1024 * 1024
+LLM_CACHE_TTL = 60 * 60
+llm_cache = TTLCache(max_bytes=LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL)
+
+# Shared, bounded pool for the stream pumps of prefetch_stream, sized for every job
+# worker holding STAGES_PER_JOB pumps at the same time
+_stage_pool = ThreadPoolExecutor(max_workers=STAGES_PER_JOB * JOB_WORKERS, thread_name_prefix="engine-stage")
+
+# Hedged requests (opt-in per call): once a request has run longer than the
+# profile's observed HEDGE_PERCENTILE latency, a duplicate is sent on another key
+# and the first answer wins. Each request earns HEDGE_MAX_RATE of a hedge (banked
+# up to HEDGE_BURST), which caps the extra quota spent on duplicates.
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20  # no hedging until a profile has this many latency samples
+HEDGE_LATENCY_WINDOW = 200
+HEDGE_MAX_RATE = 0.05
+HEDGE_BURST = 3.0
+HEDGE_WORKERS = 4  # hedges in flight at once; beyond that, requests just wait on the primary
+# Primaries and hedges use separate pools so a hedge never queues behind the
+# primaries it is meant to rescue
+_primary_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="gemini-primary")
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="gemini-hedge")
+_hedges_in_flight = 0
+_latencies = defaultdict(lambda: deque(maxlen=HEDGE_LATENCY_WINDOW))
+_hedge_lock = threading.Lock()
+_hedge_budget = HEDGE_BURST
+_hedge_counters = {"requests": 0, "fired": 0, "won": 0, "rate_capped": 0, "pool_busy": 0}
+_slo_misses = defaultdict(int)
+
+def _get_model(api_key, model_name=DEFAULT_MODEL):
     """
-    Fetches a response from Gemini using the Round Robin key manager.
+    Returns a pooled GenerativeModel whose client carries its own API key,
+    so requests never depend on (or race over) the global genai.configure() state.
     """
-    try:
-        # 1. Get the current key from Round Robin
-        current_key = key_manager.get_next_gemini_key()
-        
-        # 2. Configure the library
-        genai.configure(api_key=current_key)
-        
-        # 3. Initialize the model 
-        model = genai.GenerativeModel('gemini-2.5-flash-lite')
-        
-        # 4. Execute the prompt
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=temperature,
-            )
-        )
+    pool_key = (api_key, model_name)
+    model = _models.get(pool_key)
+    if model is not None:
+        return model
+
+    # The Gemini SDK is heavy to import, so it is loaded on first use rather than with the page
+    import google.generativeai as genai
+    from google.ai import generativelanguage as glm
+
+    with _pool_lock:
+        model = _models.get(pool_key)
+        if model is None:
+            transport = _transports.get(api_key)
+            if transport is None:
+                transport = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+                _transports[api_key] = transport
+            model = genai.GenerativeModel(model_name)
+            model._client = transport
+            _models[pool_key] = model
+    return model
+
+def _generation_config(**kwargs):
+    import google.generativeai as genai
+    return genai.types.GenerationConfig(**kwargs)
+
+def get_profile(name):
+    """The named generation profile with its model resolved; unknown names fall back to "default"."""
+    profile = GENERATION_PROFILES.get(name)
+    if profile is None:
+        logger.warning("unknown generation profile %r, using default", name)
+        name, profile = "default", GENERATION_PROFILES["default"]
+    return {**profile, "name": name, "model": MODEL_TIERS[profile["tier"]]}
+
+def _request_args(profile, temperature, response_mime_type=None):
+    """generate_content keyword arguments that enforce a profile."""
+    config = {
+        "temperature": profile["temperature"] if temperature is None else temperature,
+        "max_output_tokens": profile["max_output_tokens"],
+    }
+    if response_mime_type is not None:
+        config["response_mime_type"] = response_mime_type
+    return {
+        "generation_config": _generation_config(**config),
+        "request_options": {"timeout": profile["timeout"]},
+    }
+
+def _record_latency(profile, latency):
+    with _hedge_lock:
+        _latencies[profile["name"]].append(latency)
+        if profile["slo"] is not None and latency > profile["slo"]:
+            _slo_misses[profile["name"]] += 1
+
+def _percentile(name, fraction):
+    with _hedge_lock:
+        samples = sorted(_latencies[name])
+    if not samples:
+        return None
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+def _hedge_delay(name):
+    """Seconds to wait before hedging: the profile's HEDGE_PERCENTILE latency, or None if unknown."""
+    with _hedge_lock:
+        if len(_latencies[name]) < HEDGE_MIN_SAMPLES:
+            return None
+    return _percentile(name, HEDGE_PERCENTILE)
+
+def _earn_hedge_budget():
+    """Every hedge-enabled request earns LLM_HEDGE_MAX_RATE of a hedge, banked up to HEDGE_BURST."""
+    global _hedge_budget
+    max_rate = st.secrets.get("LLM_HEDGE_MAX_RATE", HEDGE_MAX_RATE)
+    with _hedge_lock:
+        _hedge_counters["requests"] += 1
+        _hedge_budget = min(_hedge_budget + max_rate, HEDGE_BURST)
+
+def _take_hedge_budget():
+    global _hedge_budget, _hedges_in_flight
+    with _hedge_lock:
+        if _hedge_budget < 1:
+            _hedge_counters["rate_capped"] += 1
+            return False
+        if _hedges_in_flight >= HEDGE_WORKERS:
+            _hedge_counters["pool_busy"] += 1
+            return False
+        _hedge_budget -= 1
+        _hedges_in_flight += 1
+        _hedge_counters["fired"] += 1
+        return True
+
+def _hedge_finished(_future):
+    global _hedges_in_flight
+    with _hedge_lock:
+        _hedges_in_flight -= 1
+
+def _hedged_call(name, generate):
+    """
+    Runs generate(api_key) through the key pool and, if it is still running after
+    the profile's tail latency, races a duplicate on a different key. The losing
+    request is left to finish in the background and its result is ignored.
+    """
+    _earn_hedge_budget()
+    delay = _hedge_delay(name)
+    if delay is None or key_manager.gemini.size() < 2:
+        return key_manager.gemini.call(generate)
+
+    primary_keys = []
+    primary_started = threading.Event()
+    started_at = []
+
+    def _primary(api_key):
+        primary_keys.append(api_key)
+        if not started_at:
+            started_at.append(time.monotonic())
+            primary_started.set()
+        return generate(api_key)
+
+    primary = _primary_pool.submit(key_manager.gemini.call, _primary)
+    # Time spent queued for a worker doesn't count toward the delay: the clock starts
+    # once the primary has picked its key and is talking to the API
+    primary.add_done_callback(lambda _: primary_started.set())
+    primary_started.wait()
+    if not started_at:
+        return primary.result() # Finished (failed) before reaching the API
+    done, _ = wait([primary], timeout=max(started_at[0] + delay - time.monotonic(), 0))
+    if done or not _take_hedge_budget():
+        return primary.result()
+
+    hedge = _hedge_pool.submit(key_manager.gemini.call, generate, exclude=set(primary_keys))
+    hedge.add_done_callback(_hedge_finished)
+    pending = {primary, hedge}
+    while True:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        winner = next((future for future in done if future.exception() is None), None)
+        if winner is not None:
+            if winner is hedge:
+                with _hedge_lock:
+                    _hedge_counters["won"] += 1
+            return winner.result()
+        if not pending:
+            return primary.result() # Both failed: surface the primary's error
+
+def _generate_text(prompt, temperature=None, response_mime_type=None, cache=True, profile="default", hedge=False):
+    """
+    Raw generation through the key pool under a generation profile (temperature,
+    when given, overrides the profile's). Raises once every healthy key has failed.
+    With cache=True identical requests are served from llm_cache, and concurrent
+    identical requests share a single in-flight API call. hedge=True races a
+    duplicate request on another key when this one runs into the profile's tail latency.
+    """
+    profile = get_profile(profile)
+    request_args = _request_args(profile, temperature, response_mime_type)
+
+    def _generate(api_key):
+        model = _get_model(api_key, profile["model"])
+        response = guarded("gemini", lambda: model.generate_content(prompt, **request_args))
         return response.text
 
+    def _call():
+        start = time.perf_counter()
+        text = _hedged_call(profile["name"], _generate) if hedge else key_manager.gemini.call(_generate)
+        _record_latency(profile, time.perf_counter() - start)
+        return text
+
+    if not cache:
+        return _call()
+    cache_key = (profile["model"], prompt, request_args["generation_config"].temperature, response_mime_type, profile["max_output_tokens"])
+    return llm_cache.get_or_compute(cache_key, _call, cacheable=lambda text: bool(text and text.strip()))
+
+def get_gemini_response(prompt, temperature=None, cache=True, profile="default", hedge=False):
+    """
+    Fetches a response from Gemini under the named generation profile (see
+    GENERATION_PROFILES). The process-wide key pool picks a healthy key and fails
+    over to the next one on 429/5xx. Pass cache=False for prompts that should
+    produce a fresh variation on every call, and hedge=True for latency sensitive
+    calls (see _hedged_call).
+    """
+    try:
+        return _generate_text(prompt, temperature, cache=cache, profile=profile, hedge=hedge)
+    except Exception as e:
+        # Fail-Soft Mechanism: every healthy key has been tried
+        return f"Engine Error: {str(e)}"
+
+def stream_gemini_response(prompt, temperature=None, cache=True, profile="default"):
+    """
+    Streaming variant of get_gemini_response: yields text chunks as Gemini produces
+    them, for use with st.write_stream. Failover only happens before the first chunk;
+    a cached response is yielded in one piece.
+    """
+    profile = get_profile(profile)
+    request_args = _request_args(profile, temperature)
+    cache_key = (profile["model"], prompt, request_args["generation_config"].temperature, None, profile["max_output_tokens"])
+    if cache:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    def _open_stream(api_key):
+        model = _get_model(api_key, profile["model"])
+        # The first chunk is fetched eagerly, so 429/5xx surface here and trigger failover
+        return guarded("gemini", lambda: model.generate_content(prompt, stream=True, **request_args))
+
+    chunks = []
+    start = time.perf_counter()
+    try:
+        for chunk in key_manager.gemini.call(_open_stream):
+            text = chunk.text
+            chunks.append(text)
+            yield text
     except Exception as e:
-        # Fail-Soft Mechanism: In a production scenario, we would loop back 
-        # to the key_manager to grab the next key if we hit a 429 error.
-        return f"Engine Error: {str(e)}"
\ No newline at end of file
+        yield f"Engine Error: {str(e)}"
+        return
+    _record_latency(profile, time.perf_counter() - start)
+
+    full_text = "".join(chunks)
+    if cache and full_text.strip():
+        llm_cache.set(cache_key, full_text)
+
+def prefetch_stream(chunks, timeout, fallback):
+    """
+    Starts consuming a chunk generator in the background right away and returns a
+    generator that replays it. Lets several streams run concurrently while the page
+    renders them one after another. If nothing arrives within `timeout` seconds the
+    fallback text is yielded instead; a stream cut off by the timeout just ends.
+    The timeout runs from the moment the stream starts; waiting for a pool thread
+    is bounded by the same timeout, and a timed-out stream is cancelled so it
+    gives its pool thread back.
+    """
+    buffer = queue.Queue()
+    end = object()
+    started = threading.Event()
+    stop = threading.Event()
+    started_at = []
+
+    def _pump():
+        if stop.is_set():
+            return # Timed out while queued
+        started_at.append(time.monotonic())
+        started.set()
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    break
+                buffer.put(chunk)
+        finally:
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close() # Releases the upstream stream when cut off early
+            buffer.put(end)
+
+    queued_at = time.monotonic()
+    future = _stage_pool.submit(_pump)
+
+    def _replay():
+        if not started.wait(max(queued_at + timeout - time.monotonic(), 0)):
+            stop.set()
+            future.cancel()
+            yield fallback
+            return
+        deadline = started_at[0] + timeout
+        received = False
+        while True:
+            try:
+                item = buffer.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                stop.set()
+                item = end
+            if item is end:
+                if not received:
+                    yield fallback
+                return
+            received = True
+            yield item
+
+    return _replay()
+
+def get_gemini_responses(prompts, temperature=None, max_workers=None, placeholder="AI response unavailable right now.", cache=True, profile="default", hedge=False):
+    """
+    Runs several independent prompts concurrently over a bounded thread pool.
+    Results keep the order of `prompts`; a failed item degrades to `placeholder`
+    instead of failing the whole batch.
+    """
+    if not prompts:
+        return []
+
+    if max_workers is None:
+        per_key = st.secrets.get("LLM_CONCURRENCY_PER_KEY", DEFAULT_CONCURRENCY_PER_KEY)
+        max_workers = max(key_manager.gemini.size(), 1) * per_key
+    max_workers = max(1, min(max_workers, len(prompts)))
+
+    def _safe_generate(prompt):
+        try:
+            text = get_gemini_response(prompt, temperature=temperature, cache=cache, profile=profile, hedge=hedge)
+        except Exception:
+            return placeholder
+        return placeholder if text.startswith("Engine Error:") else text
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini-batch") as pool:
+        return list(pool.map(_safe_generate, prompts))
+
+def get_gemini_json(prompt, temperature=None, cache=True, profile="default", hedge=False):
+    """
+    Requests a structured JSON response. Returns the parsed object, or None if
+    the call failed or the model did not return valid JSON.
+    """
+    try:
+        return json.loads(_generate_text(prompt, temperature, response_mime_type="application/json", cache=cache, profile=profile, hedge=hedge))
+    except Exception:
+        return None
+
+def get_cache_stats():
+    """Hit/miss/eviction counters for the LLM response cache."""
+    return llm_cache.stats()
+
+def get_hedge_stats():
+    """How often hedges fired and won, plus the current hedge delay per profile."""
+    with _hedge_lock:
+        counters = dict(_hedge_counters)
+        names = list(_latencies)
+    return {**counters, "delays": {name: _hedge_delay(name) for name in names}}
+
+def get_profile_stats():
+    """Observed latency against the SLO for every generation profile that has been used."""
+    with _hedge_lock:
+        counts = {name: len(samples) for name, samples in _latencies.items()}
+        misses = dict(_slo_misses)
+    return {
+        name: {
+            "requests": count,
+            "p50": _percentile(name, 0.5),
+            "p95": _percentile(name, 0.95),
+            "slo": GENERATION_PROFILES[name]["slo"],
+            "slo_misses": misses.get(name, 0),
+        }
+        for name, count in counts.items()
+    }
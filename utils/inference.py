@@ -0,0 +1,51 @@
+import re
+import numpy as np
+
+class EngagementPredictor:
+    """
+    Dependency-light replacement for the pickled TF-IDF + RandomForest pipeline.
+    Works from the flat arrays written by utils/train_models.export_engagement_model
+    and scores one draft or thousands in a single vectorized call.
+    """
+    def __init__(self, arrays):
+        self.vocabulary = {str(term): i for i, term in enumerate(arrays["terms"])}
+        self.idf = arrays["idf"]
+        self.token_pattern = re.compile(str(arrays["token_pattern"]))
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.max_depth = int(arrays["max_depth"])
+        self._tree_index = np.arange(self.feature.shape[0])[None, :]
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls({key: data[key] for key in data.files})
+
+    def transform(self, texts):
+        """TF-IDF features (l2-normalized), cast to float32 exactly like sklearn's trees do."""
+        n_features = len(self.vocabulary)
+        flat = [
+            row * n_features + col
+            for row, text in enumerate(texts)
+            for col in map(self.vocabulary.get, self.token_pattern.findall(text.lower()))
+            if col is not None
+        ]
+        counts = np.bincount(np.array(flat, dtype=np.int64), minlength=len(texts) * n_features)
+        tfidf = counts.reshape(len(texts), n_features) * self.idf
+        norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+        np.divide(tfidf, norms, out=tfidf, where=norms > 0)
+        return tfidf.astype(np.float32)
+
+    def predict(self, texts):
+        """Mean leaf value over all trees for every text; walks every tree for every row at once."""
+        X = self.transform(texts)
+        rows = np.arange(X.shape[0])[:, None]
+        nodes = np.zeros((X.shape[0], self.feature.shape[0]), dtype=np.int64)
+        for _ in range(self.max_depth):
+            values = X[rows, self.feature[self._tree_index, nodes]]
+            go_left = values <= self.threshold[self._tree_index, nodes]
+            nodes = np.where(go_left, self.left[self._tree_index, nodes], self.right[self._tree_index, nodes])
+        return self.value[self._tree_index, nodes].mean(axis=1)
@@ -0,0 +1,176 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from core.config import JOB_WORKERS
+
+# Long LLM tasks run on JOB_WORKERS threads instead of the Streamlit script thread
+JOB_MAX_PENDING = 64  # queued + running across all users
+JOB_MAX_PER_OWNER = 3
+JOB_RESULT_TTL = 30 * 60  # finished jobs are kept this long for users who come back later
+# Pages follow their own job live (see follow_job); polling only covers users who
+# come back to a job started earlier, so a short interval costs little
+JOB_POLL_INTERVAL = 0.5
+JOB_FOLLOW_TICK = 0.25  # how often follow_job yields to Streamlit while waiting for output
+
+class JobQueueFull(RuntimeError):
+    pass
+
+class Job:
+    def __init__(self, owner, kind):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.kind = kind
+        self.status = "queued"  # queued -> running -> done | failed
+        self.partial = ""  # text produced so far, for progress rendering
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def update(self, partial):
+        with self._changed:
+            self.partial = partial
+            self._changed.notify_all()
+
+    def wait_for_change(self, seen, timeout):
+        """Blocks until partial differs from `seen`, the job finishes, or timeout passes."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.partial != seen or self.finished, timeout)
+
+_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_jobs = {}
+_jobs_lock = threading.Lock()
+_counters = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0}
+
+def _purge_expired(now):
+    expired = [job_id for job_id, job in _jobs.items() if job.finished and now - job.finished_at > JOB_RESULT_TTL]
+    for job_id in expired:
+        del _jobs[job_id]
+
+def _run(job, fn, args, kwargs):
+    job.status = "running"
+    try:
+        job.result = fn(job, *args, **kwargs)
+        status = "done"
+    except Exception as e:
+        job.error = str(e)
+        status = "failed"
+    job.finished_at = time.time()
+    # Status flips last so readers never see a finished job without its result
+    with _jobs_lock:
+        job.status = status
+        _counters[status] += 1
+    with job._changed:
+        job._changed.notify_all()
+
+def submit_job(owner, kind, fn, *args, **kwargs):
+    """
+    Queues fn(job, *args, **kwargs) on the bounded job pool and returns the job id.
+    fn may call job.update(partial_text) to report progress; its return value becomes
+    job.result. Raises JobQueueFull when the pool or the owner's quota is saturated.
+    """
+    with _jobs_lock:
+        _purge_expired(time.time())
+        pending = [job for job in _jobs.values() if not job.finished]
+        if len(pending) >= JOB_MAX_PENDING:
+            _counters["rejected"] += 1
+            raise JobQueueFull("The AI engine is busy right now. Try again in a moment.")
+        if sum(job.owner == owner for job in pending) >= JOB_MAX_PER_OWNER:
+            _counters["rejected"] += 1
+            raise JobQueueFull(f"You already have {JOB_MAX_PER_OWNER} tasks running. Wait for one to finish.")
+        job = Job(owner, kind)
+        _jobs[job.id] = job
+        _counters["submitted"] += 1
+    _pool.submit(_run, job, fn, args, kwargs)
+    return job.id
+
+def get_job(job_id, owner):
+    """The job if it exists, has not expired and belongs to owner; otherwise None."""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    return job if job is not None and job.owner == owner else None
+
+def get_job_stats():
+    with _jobs_lock:
+        pending = [job for job in _jobs.values() if not job.finished]
+        return {
+            **_counters,
+            "queued": sum(job.status == "queued" for job in pending),
+            "running": sum(job.status == "running" for job in pending),
+            "stored": len(_jobs),
+        }
+
+def _finish(job_key, job, on_done):
+    st.session_state.pop(job_key, None)
+    if job.status == "failed":
+        st.session_state[f"{job_key}_error"] = job.error
+    else:
+        on_done(job.result)
+    st.rerun()
+
+def follow_job(job_key, label, on_done):
+    """
+    Streams the job's output onto the page as it is produced, for the script run
+    that submitted it, then hands the result to on_done(result) and reruns. If the
+    user navigates away or interacts meanwhile, Streamlit stops this run and the
+    job carries on in the pool; job_status picks it up when they come back.
+    """
+    job = get_job(st.session_state.get(job_key), st.session_state["user"].id)
+    if job is None:
+        st.session_state.pop(job_key, None)
+        st.rerun()
+
+    with st.spinner(f"{label}..."):
+        placeholder = st.empty()
+        shown = ""
+        while not job.finished:
+            job.wait_for_change(shown, JOB_FOLLOW_TICK)
+            shown = job.partial
+            # Re-rendering on every tick also lets Streamlit stop this run promptly
+            placeholder.markdown(shown)
+    placeholder.empty()
+    _finish(job_key, job, on_done)
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def job_status(job_key, label, on_done):
+    """
+    Polling fragment for a job that is no longer followed live, e.g. after the user
+    left the page and came back. Shows progress every JOB_POLL_INTERVAL seconds, so
+    output arrives in steps rather than token by token; once finished, hands the
+    result to on_done(result), forgets the job id and reruns the page so the regular
+    result sections render. Only call it while the key is set; it stops polling when
+    the page stops calling it.
+    """
+    job = get_job(st.session_state.get(job_key), st.session_state["user"].id)
+    if job is None:
+        # Expired or from another process: nothing left to wait for
+        st.session_state.pop(job_key, None)
+        st.rerun()
+
+    if not job.finished:
+        with st.container(border=True):
+            st.info(f"⏳ {label}... You can leave this page; the result will be waiting when you come back.")
+            if job.partial:
+                st.markdown(job.partial)
+        return
+
+    _finish(job_key, job, on_done)
+
+def pop_job_error(job_key):
+    """Error message of the last failed job under job_key, shown once."""
+    return st.session_state.pop(f"{job_key}_error", None)
+
+def stream_job(job, chunks):
+    """Job body for a text stream: publishes the growing text as progress, returns the full text."""
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        job.update(text)
+    return text
@@ -0,0 +1,35 @@
+import json
+
+def build_search_query_prompt(role, eco, strategy):
+    """Asks for a single Google query string that surfaces matching LinkedIn profiles."""
+    return f"Generate a strict Google search query to find LinkedIn profiles of professionals. Target: {role} at {eco}. Strategy: {strategy}. Return ONLY the search string, no quotes. Example: site:linkedin.com/in/ 'Senior Software Engineer' 'Google'."
+
+def build_banner_prompt(target_role, banner_style):
+    """Text-to-image prompt for the Banner Studio."""
+    return f"A professional LinkedIn background banner for a {target_role}, style: {banner_style}, high resolution, clean corporate aesthetic, abstract geometric shapes, no text, no words."
+
+def build_pitch_prompt(mentor, target_role, pitch_tone, refinement=None):
+    """Single connection-request pitch for one mentor."""
+    prompt = f"Write a 1-sentence personalized LinkedIn connection request pitch to {mentor['name']}, who is a {mentor['role']}. The user is a student aiming for a {target_role} role. Tone: {pitch_tone}. Context from their profile: '{mentor['snippet']}'. Keep it under 20 words."
+    if refinement:
+        prompt += f" Apply this feedback to the pitch: {refinement}"
+    return prompt
+
+def build_batch_pitch_prompt(mentors, target_role, pitch_tone, refinement=None):
+    """One prompt covering every mentor; the model answers with a JSON array indexed by mentor."""
+    profiles = json.dumps(
+        [{"index": i, "name": m['name'], "role": m['role'], "context": m['snippet']} for i, m in enumerate(mentors)],
+        ensure_ascii=False,
+    )
+    prompt = f"""
+    Write a 1-sentence personalized LinkedIn connection request pitch for EACH professional below.
+    The user is a student aiming for a {target_role} role. Tone: {pitch_tone}. Keep every pitch under 20 words.
+
+    Professionals (JSON): {profiles}
+
+    Respond ONLY with a JSON array containing one object per professional, in this exact shape:
+    [{{"index": 0, "pitch": "..."}}]
+    """
+    if refinement:
+        prompt += f"\nApply this feedback to every pitch: {refinement}"
+    return prompt
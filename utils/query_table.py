@@ -0,0 +1,109 @@
+import argparse
+import hashlib
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from utils.prompts import build_search_query_prompt
+
+logger = logging.getLogger(__name__)
+
+# Closed input lists used by Onboarding, Profile and the Connection Hub
+TARGET_ROLES = ["SDE", "ML Engineer", "Data Scientist", "DevOps", "Full Stack", "Competitive Programmer"]
+TARGET_ECOSYSTEMS = ["FAANG/Big Tech", "Product-Based Startups", "Service-Based Companies"]
+SEARCH_STRATEGIES = ["Direct Role Match (Seniors)", "Technical Recruiters / HR", "Startup Founders / CTOs"]
+
+QUERY_TABLE_PATH = "assets/search_queries.json"
+TABLE_VERSION = 1
+
+# Offline templates, used when the table is built without calling Gemini
+ROLE_TITLES = {
+    "SDE": "Software Engineer",
+    "ML Engineer": "Machine Learning Engineer",
+    "Data Scientist": "Data Scientist",
+    "DevOps": "DevOps Engineer",
+    "Full Stack": "Full Stack Developer",
+    "Competitive Programmer": "Software Engineer",
+}
+ECOSYSTEM_TERMS = {
+    "FAANG/Big Tech": '("Google" OR "Meta" OR "Amazon" OR "Apple" OR "Microsoft" OR "Netflix")',
+    "Product-Based Startups": '("startup" OR "Series A" OR "Series B")',
+    "Service-Based Companies": '("TCS" OR "Infosys" OR "Accenture" OR "Wipro" OR "Cognizant")',
+}
+
+_table = None
+_table_lock = threading.Lock()
+
+def _table_key(role, eco, strategy):
+    return f"{role}|{eco}|{strategy}"
+
+def _prompt_fingerprint():
+    """Changes whenever the query prompt wording changes, so stale tables are detectable."""
+    sample = build_search_query_prompt("{role}", "{eco}", "{strategy}")
+    return hashlib.sha256(sample.encode("utf-8")).hexdigest()[:12]
+
+def _template_query(role, eco, strategy):
+    title = ROLE_TITLES[role]
+    if strategy == "Technical Recruiters / HR":
+        who = f'("Technical Recruiter" OR "Talent Acquisition") "{title}"'
+    elif strategy == "Startup Founders / CTOs":
+        who = '("Founder" OR "CTO" OR "Co-Founder")'
+    else:
+        who = f'"Senior {title}"'
+    return f"site:linkedin.com/in/ {who} {ECOSYSTEM_TERMS[eco]}"
+
+def load_query_table(path=QUERY_TABLE_PATH):
+    """Loads the precomputed table once per process. Missing or outdated tables load as empty."""
+    global _table
+    if _table is not None:
+        return _table
+    with _table_lock:
+        if _table is None:
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                _table = data["queries"] if data.get("version") == TABLE_VERSION else {}
+                if data.get("prompt_fingerprint") != _prompt_fingerprint():
+                    logger.warning("query prompt changed since the table was built; regenerate it with `python -m utils.query_table`.")
+            except Exception as e:
+                logger.warning("not loaded: %s", e)
+                _table = {}
+    return _table
+
+def lookup_query(role, eco, strategy):
+    """Zero-latency fast path: the precomputed query, or None if the combination is unknown."""
+    return load_query_table().get(_table_key(role, eco, strategy))
+
+def build_query_table(use_llm=True, path=QUERY_TABLE_PATH):
+    print(f"Building search query table ({'Gemini' if use_llm else 'offline templates'})...")
+    if use_llm:
+        from utils.engine import get_gemini_response
+
+    queries = {}
+    for role, eco, strategy in itertools.product(TARGET_ROLES, TARGET_ECOSYSTEMS, SEARCH_STRATEGIES):
+        query = None
+        if use_llm:
+            query = get_gemini_response(build_search_query_prompt(role, eco, strategy), profile="search_query").strip()
+            if query.startswith("Engine Error:") or not query:
+                print(f"⚠️ LLM failed for {role} / {eco} / {strategy}, using template.")
+                query = None
+        queries[_table_key(role, eco, strategy)] = query or _template_query(role, eco, strategy)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "version": TABLE_VERSION,
+            "prompt_fingerprint": _prompt_fingerprint(),
+            "source": "gemini" if use_llm else "template",
+            "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "queries": queries,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"✅ {os.path.basename(path)} saved ({len(queries)} combinations).")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate the precomputed Connection Hub search query table.")
+    parser.add_argument("--offline", action="store_true", help="Build from templates without calling Gemini.")
+    args = parser.parse_args()
+    build_query_table(use_llm=not args.offline)
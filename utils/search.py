@@ -0,0 +1,129 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from core.key_manager import key_manager
+from core.outbound import request
+from core.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SERPER_URL = "https://google.serper.dev/search"
+
+# Results are served fresh for SERPER_CACHE_TTL seconds, then served stale while a
+# background refresh runs for up to SERPER_STALE_TTL more seconds. Both can be
+# overridden in secrets.toml.
+SERPER_CACHE_TTL = 6 * 60 * 60
+SERPER_STALE_TTL = 24 * 60 * 60
+SERPER_CACHE_DIR = ".cache/serper"
+
+_memory = TTLCache(max_bytes=8 * 1024 * 1024, ttl=SERPER_CACHE_TTL + SERPER_STALE_TTL)
+_refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="serper-refresh")
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+def _ttls():
+    fresh = st.secrets.get("SERPER_CACHE_TTL", SERPER_CACHE_TTL)
+    stale = st.secrets.get("SERPER_STALE_TTL", SERPER_STALE_TTL)
+    return fresh, stale
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+def _cache_key(query, num):
+    return hashlib.sha256(f"{normalize_query(query)}|{num}".encode("utf-8")).hexdigest()
+
+def _disk_path(cache_key):
+    return os.path.join(SERPER_CACHE_DIR, f"{cache_key}.json")
+
+def _read_disk(cache_key):
+    try:
+        with open(_disk_path(cache_key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_disk(cache_key, entry):
+    try:
+        os.makedirs(SERPER_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{_disk_path(cache_key)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, _disk_path(cache_key))
+    except OSError as e:
+        logger.warning("could not persist Serper result: %s", e)
+
+def _fetch(query, num):
+    """Live Serper call through the shared key pool (fails over on 429/5xx) and the pooled Serper session."""
+    payload = json.dumps({"q": query, "num": num})
+
+    def _post(serper_key):
+        headers = {
+            'X-API-KEY': serper_key,
+            'Content-Type': 'application/json'
+        }
+        response = request("serper", "POST", SERPER_URL, headers=headers, data=payload)
+        response.raise_for_status()
+        return response.json().get('organic', [])
+
+    return {"query": query, "results": key_manager.serper.call(_post), "fetched_at": time.time()}
+
+def _refresh(query, num, cache_key):
+    try:
+        entry = _fetch(query, num)
+        if not entry["results"]:
+            return # Keep serving the previous results rather than caching an empty page
+        _memory.set(cache_key, entry)
+        _write_disk(cache_key, entry)
+    except Exception as e:
+        logger.warning("background refresh failed: %s", e)
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(cache_key)
+
+def search_serper(query, num=1):
+    """
+    Organic Google results for `query`, shared across every user of the process.
+    Memory first, then the local disk cache, then a live Serper call. Concurrent
+    misses for the same query share one request. Raises if the live call fails.
+    Empty result pages are returned but never cached, so one odd response doesn't
+    stick for every user of that query.
+    """
+    fresh_ttl, stale_ttl = _ttls()
+    cache_key = _cache_key(query, num)
+
+    def _load():
+        entry = _read_disk(cache_key)
+        if entry and entry["results"] and time.time() - entry["fetched_at"] < fresh_ttl + stale_ttl:
+            return entry
+        entry = _fetch(query, num)
+        if entry["results"]:
+            _write_disk(cache_key, entry)
+        return entry
+
+    def _cacheable(entry):
+        return bool(entry["results"])
+
+    entry = _memory.get_or_compute(cache_key, _load, cacheable=_cacheable)
+    age = time.time() - entry["fetched_at"]
+
+    if age >= fresh_ttl + stale_ttl:
+        # Too old to serve even as stale (memory TTL can outlive a lowered secret)
+        _memory.invalidate(cache_key)
+        entry = _memory.get_or_compute(cache_key, _load, cacheable=_cacheable)
+    elif age >= fresh_ttl:
+        # Stale-while-revalidate: answer now, refresh in the background once
+        with _refresh_lock:
+            start_refresh = cache_key not in _refreshing
+            _refreshing.add(cache_key)
+        if start_refresh:
+            _refresh_pool.submit(_refresh, query, num, cache_key)
+
+    return entry["results"]
+
+def get_search_cache_stats():
+    return _memory.stats()
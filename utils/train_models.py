@@ -1,11 +1,131 @@
 import os
+import sys
+import itertools
 import numpy as np
 import joblib
+from scipy.optimize import linear_sum_assignment
 from sklearn.cluster import KMeans
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.pipeline import Pipeline
 
+# The 10 CSE archetype centres. Features: [DSA, OOPS, DBMS, OS, System_Design] (Scale 1-5)
+ARCHETYPE_CENTROIDS = {
+    0: [5, 3, 2, 2, 1], # Competitive Programmer
+    1: [4, 5, 5, 3, 4], # Backend Architect
+    2: [2, 3, 4, 5, 4], # DevOps / SRE
+    3: [2, 2, 5, 4, 2], # Database Admin (DBA)
+    4: [4, 4, 2, 5, 3], # Systems Programmer
+    5: [3, 4, 3, 3, 3], # Core Generalist
+    6: [2, 3, 2, 1, 1], # UI/Frontend Specialist
+    7: [1, 2, 1, 1, 1], # Academic Beginner
+    8: [3, 5, 4, 2, 3], # Enterprise OOPs Dev
+    9: [5, 5, 5, 5, 5]  # The FAANG Unicorn
+}
+
+PERSONA_LABELS = [
+    "The Competitive Programmer",
+    "The Backend Architect",
+    "The DevOps / SRE",
+    "The Database Administrator",
+    "The Systems Programmer",
+    "The Core Generalist",
+    "The UI/Frontend Specialist",
+    "The Academic Beginner",
+    "The Enterprise Java Dev",
+    "The FAANG Unicorn"
+]
+
+def export_persona_lookup(kmeans, path='ml_models/persona_lookup.npz'):
+    """
+    Precomputes the persona for every possible skill vector (5 skills x 5 levels = 3,125 inputs).
+    KMeans cluster ids are arbitrary, so each cluster is first matched one-to-one to the
+    nearest archetype centroid; labels therefore stay stable across retrains.
+    Index of a vector v is sum((v[i] - 1) * 5 ** (4 - i)).
+    """
+    archetypes = np.array([ARCHETYPE_CENTROIDS[i] for i in range(len(ARCHETYPE_CENTROIDS))], dtype=float)
+    distances = np.linalg.norm(kmeans.cluster_centers_[:, None, :] - archetypes[None, :, :], axis=2)
+    cluster_ids, archetype_ids = linear_sum_assignment(distances)
+    cluster_to_archetype = np.empty(len(cluster_ids), dtype=np.uint8)
+    cluster_to_archetype[cluster_ids] = archetype_ids
+
+    grid = np.array(list(itertools.product(range(1, 6), repeat=5)), dtype=float)
+    lookup = cluster_to_archetype[kmeans.predict(grid)]
+    np.savez(path, lookup=lookup, labels=np.array(PERSONA_LABELS))
+    print(f"✅ {os.path.basename(path)} saved ({len(lookup)} skill vectors).")
+
+# Training posts for the engagement model, also used to verify the compiled export
+ENGAGEMENT_POSTS = [
+    "Thrilled to announce our team won 1st place at the Solasta Hackathon! We built an autonomous AI agent using Gemini 1.5 Flash and Supabase. #HackathonWinner",
+    "Just open-sourced my Kubernetes deployment pipeline. It reduces CI/CD build times by 40%. Check out the GitHub repo below!",
+    "Deep dive into System Design: How does Netflix handle global scale? Here is my breakdown of their microservices architecture.",
+    "Midnight struggles with React useEffect hooks... why does it keep re-rendering?! Finally fixed it after 3 hours. #codinglife",
+    "Completed the 100 Days of Code challenge! It was a long journey but I learned a lot.",
+    "Looking for a software engineering job. Please refer me. I know Java.",
+    "Just learned python. It is a good language."
+]
+ENGAGEMENT_SCORES = [98.0, 92.0, 88.0, 65.0, 55.0, 15.0, 12.0]
+
+# Largest difference allowed between the compiled predictor and the sklearn pipeline
+EXPORT_TOLERANCE = 1e-9
+
+def export_engagement_model(pipeline, path='ml_models/engagement_compiled.npz', check_posts=ENGAGEMENT_POSTS):
+    """
+    Flattens the TF-IDF vocabulary, IDF weights and every tree of the forest into
+    padded NumPy arrays (node feature / threshold / children / value) for
+    utils.inference.EngagementPredictor. Leaves point at themselves so a fixed
+    number of vectorized steps walks every tree to its leaf. The export is written
+    to a temporary file and only replaces `path` if the compiled predictor matches
+    pipeline.predict on check_posts; otherwise it aborts.
+    """
+    from utils.inference import EngagementPredictor
+    tfidf = pipeline.named_steps['tfidf']
+    rf = pipeline.named_steps['rf']
+    assert tfidf.analyzer == 'word' and tfidf.ngram_range == (1, 1) and tfidf.lowercase
+    assert tfidf.norm == 'l2' and tfidf.use_idf and not tfidf.sublinear_tf and tfidf.stop_words is None
+
+    terms = sorted(tfidf.vocabulary_, key=tfidf.vocabulary_.get)
+    trees = [est.tree_ for est in rf.estimators_]
+    n_nodes = max(tree.node_count for tree in trees)
+
+    feature = np.zeros((len(trees), n_nodes), dtype=np.int32)
+    threshold = np.zeros((len(trees), n_nodes), dtype=np.float64)
+    left = np.tile(np.arange(n_nodes, dtype=np.int32), (len(trees), 1))
+    right = left.copy()
+    value = np.zeros((len(trees), n_nodes), dtype=np.float64)
+
+    for t, tree in enumerate(trees):
+        count = tree.node_count
+        is_split = tree.children_left != -1
+        feature[t, :count] = np.where(is_split, tree.feature, 0)
+        threshold[t, :count] = tree.threshold
+        left[t, :count] = np.where(is_split, tree.children_left, np.arange(count))
+        right[t, :count] = np.where(is_split, tree.children_right, np.arange(count))
+        value[t, :count] = tree.value[:, 0, 0]
+
+    tmp_path = path[:-len('.npz')] + '.tmp.npz'
+    np.savez(
+        tmp_path,
+        terms=np.array(terms),
+        idf=tfidf.idf_,
+        token_pattern=np.array(tfidf.token_pattern),
+        feature=feature,
+        threshold=threshold,
+        left=left,
+        right=right,
+        value=value,
+        max_depth=np.array(max(tree.max_depth for tree in trees)),
+    )
+
+    expected = pipeline.predict(check_posts)
+    actual = EngagementPredictor.load(tmp_path).predict(check_posts)
+    max_diff = float(np.max(np.abs(np.asarray(actual) - expected)))
+    if max_diff > EXPORT_TOLERANCE:
+        os.remove(tmp_path)
+        raise RuntimeError(f"Compiled engagement model disagrees with the sklearn pipeline (max diff {max_diff}); export aborted.")
+    os.replace(tmp_path, path)
+    print(f"✅ {os.path.basename(path)} saved ({len(trees)} trees, {len(terms)} terms).")
+
 def build_models():
     print("Initializing Machine Learning Build Sequence (V2)...")
     os.makedirs('ml_models', exist_ok=True)
@@ -16,25 +136,11 @@ def build_models():
     # ---------------------------------------------------------
     print("Generating Synthetic Persona Data & Training Clusterer...")
     
-    # Define the 10 archetypes centers
-    centroids = {
-        0: [5, 3, 2, 2, 1], # Competitive Programmer
-        1: [4, 5, 5, 3, 4], # Backend Architect
-        2: [2, 3, 4, 5, 4], # DevOps / SRE
-        3: [2, 2, 5, 4, 2], # Database Admin (DBA)
-        4: [4, 4, 2, 5, 3], # Systems Programmer
-        5: [3, 4, 3, 3, 3], # Core Generalist
-        6: [2, 3, 2, 1, 1], # UI/Frontend Specialist
-        7: [1, 2, 1, 1, 1], # Academic Beginner
-        8: [3, 5, 4, 2, 3], # Enterprise OOPs Dev
-        9: [5, 5, 5, 5, 5]  # The FAANG Unicorn
-    }
-    
     X_skills = []
     np.random.seed(42)
     
     # Generate 200 synthetic profiles per archetype using normal distribution
-    for cluster_id, center in centroids.items():
+    for cluster_id, center in ARCHETYPE_CENTROIDS.items():
         noise = np.random.normal(0, 0.6, (200, 5)) # Add slight variations
         samples = np.array(center) + noise
         samples = np.clip(np.round(samples), 1, 5) # Ensure it stays within 1-5 bounds
@@ -47,22 +153,14 @@ def build_models():
     kmeans.fit(X_skills)
     joblib.dump(kmeans, 'ml_models/skill_clusterer.pkl')
     print("✅ skill_clusterer.pkl saved (10 Personas mapped).")
+    export_persona_lookup(kmeans)
 
     # ---------------------------------------------------------
     # 2. Random Forest Regressor (Viral Score Predictor)
     # ---------------------------------------------------------
     print("Training Engagement Model (Random Forest)...")
-    synthetic_posts = [
-        "Thrilled to announce our team won 1st place at the Solasta Hackathon! We built an autonomous AI agent using Gemini 1.5 Flash and Supabase. #HackathonWinner",
-        "Just open-sourced my Kubernetes deployment pipeline. It reduces CI/CD build times by 40%. Check out the GitHub repo below!",
-        "Deep dive into System Design: How does Netflix handle global scale? Here is my breakdown of their microservices architecture.",
-        "Midnight struggles with React useEffect hooks... why does it keep re-rendering?! Finally fixed it after 3 hours. #codinglife",
-        "Completed the 100 Days of Code challenge! It was a long journey but I learned a lot.",
-        "Looking for a software engineering job. Please refer me. I know Java.",
-        "Just learned python. It is a good language."
-    ] * 30 
-    
-    synthetic_scores = [98.0, 92.0, 88.0, 65.0, 55.0, 15.0, 12.0] * 30 
+    synthetic_posts = ENGAGEMENT_POSTS * 30
+    synthetic_scores = ENGAGEMENT_SCORES * 30
 
     pipeline = Pipeline([
         ('tfidf', TfidfVectorizer(max_features=100)),
@@ -71,8 +169,18 @@ def build_models():
     pipeline.fit(synthetic_posts, synthetic_scores)
     joblib.dump(pipeline, 'ml_models/engagement_model.pkl')
     print("✅ engagement_model.pkl saved.")
+    export_engagement_model(pipeline)
     
     print("\nAll models built successfully. Ready for UI integration.")
 
+def export_artifacts():
+    """Re-exports the derived artifacts from the already trained models without retraining."""
+    print("Exporting derived artifacts from existing models...")
+    export_persona_lookup(joblib.load('ml_models/skill_clusterer.pkl'))
+    export_engagement_model(joblib.load('ml_models/engagement_model.pkl'))
+
 if __name__ == "__main__":
-    build_models()
\ No newline at end of file
+    if "--export-only" in sys.argv:
+        export_artifacts()
+    else:
+        build_models()
\ No newline at end of file